@@ -1,31 +1,135 @@
-from flask import Flask, redirect, session, request, jsonify, send_from_directory
+from flask import Flask, abort, redirect, session, request, jsonify, has_request_context, stream_with_context
 from authlib.integrations.flask_client import OAuth
 from authlib.common.security import generate_token
 from dotenv import load_dotenv
 from flask_cors import CORS
-import requests
 import os
-from models import Comment
-from pymongo import MongoClient
-from datetime import datetime
+from database import db, MONGO_URI
+from models import Comment, Favorite, RecipeStats, Review
+from migrations import run_migrations
+from pagination import page_args
+from responses import PrecomputedResponse
+from sessions import MongoSessionInterface
+from json_provider import FastJSONProvider, dumps_bytes
+from logs import configure_logging
+from metrics import GaugeCallback, MetricsRegistry, RequestMetrics, phase
+from profiling import RequestProfiler
+from compression import ResponseCompressor
+from static_assets import StaticAssets
+from cache import LRUCache, MongoCache, TwoTierCache, make_cache_key
+from corpus import RecipeCorpus
+from ingredients import IngredientMatcher, ingredient_matches
+from singleflight import SingleFlight, SingleFlightTimeout
+from oidc import CachedMetadataOAuth2App, OIDCMetadataCache
+from upstream import CircuitBreaker, CircuitOpen, UpstreamClient, UpstreamUnavailable
+from quota import QuotaController, estimate_bulk_information_points, estimate_search_points
+from pymongo.errors import DuplicateKeyError
 import json
-from difflib import SequenceMatcher
+import itertools
+import logging
+import math
+import threading
+import time
 
 load_dotenv()
 
 # Ensures secret key for Flask sessions
 secret_key = os.getenv("FLASK_SECRET_KEY") or os.urandom(24)
 
+# Structured JSON logs written by a background thread, so request handlers never block on output
+configure_logging(os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
+
 # Initialize Flask app
 app = Flask(__name__)
+# orjson-backed JSON responses that encode datetimes and ObjectIds from Mongo documents directly
+app.json = FastJSONProvider(app)
+
+# Per-endpoint latency histograms with an upstream/mongo/filter/normalize/serialization breakdown,
+# exposed at /metrics; registered first so every other hook is inside the measured time
+metrics_registry = MetricsRegistry()
+request_metrics = RequestMetrics(metrics_registry)
+request_metrics.init_app(app)
+
+# cProfile of requests carrying the PROFILE_TOKEN in X-Profile, or of a PROFILE_SAMPLE_RATE share
+# of all requests; the newest PROFILE_KEEP profiles are kept in PROFILE_DIR
+request_profiler = RequestProfiler(
+    os.getenv("PROFILE_DIR", "profiles"),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    token=os.getenv("PROFILE_TOKEN"),
+    keep=int(os.getenv("PROFILE_KEEP", "50"))
+)
+request_profiler.init_app(app)
 app.config["SECRET_KEY"] = secret_key
 
+# Session data (the parsed ID token, the login nonce) is kept in Mongo behind a per-process LRU;
+# the cookie only carries the session id and revision
+app.session_interface = MongoSessionInterface(
+    db.sessions,
+    cache_size=int(os.getenv("SESSION_CACHE_SIZE", "1024")),
+    cache_ttl=int(os.getenv("SESSION_CACHE_TTL", "10"))
+)
+
 SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
 
-# MongoDB connection setup
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongo:27017/")
-client = MongoClient(MONGO_URI)
-db = client.recipe_app
+# Two-tier cache for Spoonacular search results: per-process LRU backed by a shared Mongo TTL collection
+RECIPE_CACHE_SIZE = int(os.getenv("RECIPE_CACHE_SIZE", "256"))
+RECIPE_CACHE_TTL = int(os.getenv("RECIPE_CACHE_TTL", "600"))
+RECIPE_CACHE_SHARED_TTL = int(os.getenv("RECIPE_CACHE_SHARED_TTL", "3600"))
+# Expired results are kept this much longer and served when Spoonacular is unavailable
+RECIPE_CACHE_STALE_TTL = int(os.getenv("RECIPE_CACHE_STALE_TTL", "86400"))
+recipe_cache = TwoTierCache(
+    LRUCache(maxsize=RECIPE_CACHE_SIZE, ttl=RECIPE_CACHE_TTL, stale_ttl=RECIPE_CACHE_STALE_TTL),
+    MongoCache(db.recipe_cache, ttl=RECIPE_CACHE_SHARED_TTL, stale_ttl=RECIPE_CACHE_STALE_TTL)
+)
+
+# Pooled keep-alive clients for upstream services
+spoonacular = UpstreamClient(
+    'spoonacular',
+    pool_size=int(os.getenv("SPOONACULAR_POOL_SIZE", "10")),
+    connect_timeout=float(os.getenv("SPOONACULAR_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("SPOONACULAR_READ_TIMEOUT", "10")),
+    retries=int(os.getenv("SPOONACULAR_RETRIES", "2")),
+    backoff=float(os.getenv("SPOONACULAR_RETRY_BACKOFF", "0.25")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("SPOONACULAR_BREAKER_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("SPOONACULAR_BREAKER_RESET", "30")),
+        quota_cooldown=float(os.getenv("SPOONACULAR_QUOTA_COOLDOWN", "900"))
+    )
+)
+
+# Index and data migrations run once per worker before the first request, or via `flask migrate`.
+# A failed run (e.g. MongoDB unreachable) is retried by a later request, at most once per
+# MIGRATION_RETRY_INTERVAL seconds, since the unique indexes guard favorites and reviews
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "1") == "1"
+MIGRATION_RETRY_INTERVAL = float(os.getenv("MIGRATION_RETRY_INTERVAL", "30"))
+migrations_lock = threading.Lock()
+migrations_done = False
+migrations_retry_at = 0.0
+
+@app.before_request
+def ensure_migrations():
+    global migrations_done, migrations_retry_at
+    if migrations_done or not RUN_MIGRATIONS or time.monotonic() < migrations_retry_at:
+        return
+    with migrations_lock:
+        if migrations_done or time.monotonic() < migrations_retry_at:
+            return
+        try:
+            applied = run_migrations(db)
+        except Exception:
+            logger.exception("Migrations failed, retrying in %ss", MIGRATION_RETRY_INTERVAL)
+            migrations_retry_at = time.monotonic() + MIGRATION_RETRY_INTERVAL
+            return
+        if applied:
+            logger.info("Applied migrations", extra={'versions': applied})
+        migrations_done = True
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending index and data migrations."""
+    applied = run_migrations(db)
+    print(f"Applied migrations: {applied}" if applied else "Database is up to date")
 
 oauth = OAuth(app)
 
@@ -49,6 +153,31 @@ JWKS_URI = f"{DEX_INTERNAL_HOST}/keys"
 USERINFO_ENDPOINT = f"{DEX_INTERNAL_HOST}/userinfo"
 DEVICE_ENDPOINT = f"{DEX_INTERNAL_HOST}/device/code"
 
+# Spoonacular point budget shared by all workers, with a fair share per user
+spoonacular_quota = QuotaController(
+    db.quota_buckets,
+    daily_points=float(os.getenv("SPOONACULAR_DAILY_POINTS", "150")),
+    client_share=float(os.getenv("SPOONACULAR_CLIENT_SHARE", "0.2")),
+    degraded_fraction=float(os.getenv("SPOONACULAR_DEGRADED_FRACTION", "0.1"))
+)
+
+dex_http = UpstreamClient('dex', pool_size=2, connect_timeout=2, read_timeout=5, retries=1)
+
+# Dex discovery document and signing keys, fetched when each worker starts and refreshed in the
+# background before they expire, so logins do not wait on Dex for metadata
+oidc_metadata = OIDCMetadataCache(
+    dex_http,
+    f"{DEX_INTERNAL_HOST}/.well-known/openid-configuration",
+    jwks_uri=JWKS_URI,
+    ttl=int(os.getenv("OIDC_METADATA_TTL", "3600")),
+    min_refetch_interval=float(os.getenv("OIDC_KEY_REFETCH_INTERVAL", "30"))
+)
+
+# Gunicorn workers start the refresher from post_fork; this covers other servers, once per process
+@app.before_request
+def start_oidc_refresher():
+    oidc_metadata.start()
+
 # Register OAuth client with Dex
 oauth.register(
     name=DEX_CLIENT_NAME,
@@ -60,6 +189,8 @@ oauth.register(
     userinfo_endpoint=USERINFO_ENDPOINT,
     device_authorization_endpoint=DEVICE_ENDPOINT,
     client_kwargs={"scope": "openid email profile"},
+    client_cls=CachedMetadataOAuth2App,
+    metadata_cache=oidc_metadata,
 )
 
 # Root root for home page
@@ -76,7 +207,7 @@ def login():
     session["nonce"] = nonce
     redirect_uri = "http://localhost:8000/authorize"
     dex = oauth.create_client(DEX_CLIENT_NAME)
-    print(f"Initiating login, redirect URI: {redirect_uri}")
+    logger.info("Initiating login", extra={'redirect_uri': redirect_uri})
     return dex.authorize_redirect(redirect_uri, nonce=nonce)
 
 @app.route("/authorize")
@@ -87,11 +218,12 @@ def authorize():
         nonce_val = session.get("nonce")
         user_info = dex.parse_id_token(token, nonce=nonce_val)
         session["user"] = user_info
+        session.regenerate()
         session.permanent = True
-        print(f"User authorized: {user_info.get('email', 'unknown')}")
+        logger.info("User authorized", extra={'user': user_info.get('email', 'unknown')})
         return redirect("http://localhost:5173")
-    except Exception as e:
-        print(f"Authorization error: {e}")
+    except Exception:
+        logger.exception("Authorization error")
         return redirect("http://localhost:5173?error=auth_failed")
 
 # Handles OAuth callback after user authentication
@@ -99,7 +231,7 @@ def authorize():
 def logout():
     user_email = session.get('user', {}).get('email', 'unknown')
     session.clear()
-    print(f"User logged out: {user_email}")
+    logger.info("User logged out", extra={'user': user_email})
     return redirect(os.getenv("FRONTEND_URL", "http://localhost:5173"))
 
 # API endpoint to get user profile
@@ -113,13 +245,324 @@ def get_user_profile():
 
 CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
 
+# Negotiated gzip/brotli compression of API responses above COMPRESSION_MIN_SIZE bytes
+response_compressor = ResponseCompressor(
+    min_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")),
+    memo_size=int(os.getenv("COMPRESSION_MEMO_SIZE", "256"))
+)
+app.after_request(response_compressor)
+
 # Implement fuzzy search to handle misspellings and variations
 def fuzzy_match(ingredient, recipe_ingredients, threshold=0.7):
-    for recipe_ingredient in recipe_ingredients:
-        similarity = SequenceMatcher(None, ingredient, recipe_ingredient).ratio()
-        if similarity >= threshold or ingredient in recipe_ingredient:
-            return True
-    return False
+    return any(
+        ingredient_matches(ingredient, recipe_ingredient, threshold)
+        for recipe_ingredient in recipe_ingredients
+    )
+
+# Shared ingredient vocabulary; each requested ingredient is fuzzy-matched against it once
+ingredient_matcher = IngredientMatcher(threshold=0.7)
+
+# Local corpus of every recipe received from Spoonacular, searched before going upstream
+CORPUS_MIN_RESULTS = int(os.getenv("CORPUS_MIN_RESULTS", "6"))
+recipe_corpus = RecipeCorpus(db.recipes, matcher=ingredient_matcher)
+
+# Process and normalize the recipe data for a consistent frontend display
+def normalize_recipe(recipe):
+    nutrition_data = recipe.get('nutrition', {})
+    nutrients = nutrition_data.get('nutrients', [])
+    
+    calories = 0
+    for nutrient in nutrients:
+        if nutrient.get('name') == 'Calories':
+            calories = nutrient.get('amount', 0)
+            break
+    
+    image_url = recipe.get('image', '')
+    if not image_url and recipe.get('id'):
+        image_url = f"https://spoonacular.com/recipeImages/{recipe['id']}-312x231.jpg"
+    
+    # Process the recipe data to ensure all fields are present
+    return {
+        'id': recipe.get('id'),
+        'title': recipe.get('title', f'Recipe {recipe.get("id", "")}'),
+        'image': image_url,
+        'calories': int(calories) if calories else recipe.get('calories', 0),
+        'spoonacularScore': recipe.get('spoonacularScore', 60),
+        'cuisines': recipe['cuisines'] if recipe.get('cuisines') else [],
+        'readyInMinutes': recipe.get('readyInMinutes', 30),
+        'servings': recipe.get('servings', 4),
+        'vegetarian': recipe.get('vegetarian', False),
+        'vegan': recipe.get('vegan', False),
+        'glutenFree': recipe.get('glutenFree', False),
+        'dairyFree': recipe.get('dairyFree', False),
+        'dishTypes': recipe.get('dishTypes', ['main course']),
+        'extendedIngredients': recipe.get('extendedIngredients', []),
+        'analyzedInstructions': recipe.get('analyzedInstructions', []),
+        'nutrition': nutrition_data,
+        'usedIngredientCount': recipe.get('usedIngredientCount', 0),
+        'missedIngredientCount': recipe.get('missedIngredientCount', 0),
+        'likes': recipe.get('aggregateLikes', 0)
+    }
+
+# Fields returned for each /recipes result unless `fields=` asks for others;
+# the heavy ingredient, instruction and nutrition data is served by /api/recipes/<id>
+RECIPE_DETAIL_FIELDS = ('extendedIngredients', 'analyzedInstructions', 'nutrition')
+RECIPE_LIST_FIELDS = (
+    'id', 'title', 'image', 'calories', 'spoonacularScore', 'cuisines', 'readyInMinutes',
+    'servings', 'vegetarian', 'vegan', 'glutenFree', 'dairyFree', 'dishTypes',
+    'usedIngredientCount', 'missedIngredientCount', 'likes', 'stats'
+)
+RECIPE_FIELDS = RECIPE_LIST_FIELDS + RECIPE_DETAIL_FIELDS
+
+# Fields requested through `fields=`, falling back to the compact list fields
+def requested_recipe_fields(fields_arg):
+    fields = tuple(field.strip() for field in fields_arg.split(',') if field.strip() in RECIPE_FIELDS)
+    return fields or RECIPE_LIST_FIELDS
+
+# Project a recipe onto the given fields; computed fields such as `stats` are attached separately
+def project_recipe(recipe, fields):
+    with phase('normalize'):
+        normalized = normalize_recipe(recipe)
+        return {field: normalized[field] for field in fields if field in normalized}
+
+# Stats shown for recipes none of our users have reviewed, commented on or favorited
+EMPTY_RECIPE_STATS = {'review_count': 0, 'average_rating': None, 'comment_count': 0, 'favorite_count': 0}
+
+# Attach our users' rating, comment and favorite counts to projected recipes with one batched lookup
+def attach_recipe_stats(recipes, fields=RECIPE_LIST_FIELDS):
+    if 'stats' not in fields:
+        return recipes
+    try:
+        stats = RecipeStats.get_many([recipe['id'] for recipe in recipes if recipe.get('id') is not None])
+    except Exception as e:
+        logger.warning("Failed to load recipe stats: %s", e)
+        return recipes
+    for recipe in recipes:
+        recipe['stats'] = stats.get(recipe.get('id'), EMPTY_RECIPE_STATS)
+    return recipes
+
+# Overridable so benchmarks can point the app at a local stand-in
+SPOONACULAR_BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com").rstrip('/')
+SPOONACULAR_SEARCH_URL = f'{SPOONACULAR_BASE_URL}/recipes/complexSearch'
+SPOONACULAR_INFORMATION_URL = SPOONACULAR_BASE_URL + '/recipes/{recipe_id}/information'
+SPOONACULAR_INFORMATION_POINTS = 1.025
+SPOONACULAR_BULK_URL = f'{SPOONACULAR_BASE_URL}/recipes/informationBulk'
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Incremental upstream paging: pages are sized from the observed filter pass rate
+MAX_RECIPES = 50
+SPOONACULAR_MIN_PAGE_SIZE = int(os.getenv("SPOONACULAR_MIN_PAGE_SIZE", "10"))
+SPOONACULAR_PAGE_BUDGET = int(os.getenv("SPOONACULAR_PAGE_BUDGET", "5"))
+
+# Raised when Spoonacular answers a search with a non-200 status
+class SpoonacularError(Exception):
+    def __init__(self, status_code, text=''):
+        super().__init__(f"Spoonacular API error: {status_code}")
+        self.status_code = status_code
+        self.text = text
+
+# Response when Spoonacular cannot be reached and no stale result is available
+def upstream_unavailable_response(error):
+    logger.warning("Spoonacular unavailable: %s", error, extra={'reason': error.reason})
+    if error.reason in ('quota', 'exhausted'):
+        return jsonify({'error': 'API quota exceeded. Please try again later.'}), 402
+    if error.reason == 'client_limit':
+        return jsonify({'error': 'Too many searches. Please wait a moment and try again.'}), 429
+    return jsonify({'error': 'Recipe service temporarily unavailable. Please try again later.'}), 503
+
+# Error handling for Spoonacular API responses
+def spoonacular_error_response(error):
+    if error.status_code == 402:
+        logger.warning("Spoonacular API quota exceeded")
+        return jsonify({'error': 'API quota exceeded. Please try again later.'}), 402
+    elif error.status_code == 401:
+        logger.error("Spoonacular API authentication failed")
+        return jsonify({'error': 'API authentication failed. Check API key.'}), 401
+    else:
+        logger.error("Spoonacular API error", extra={'status': error.status_code, 'response_text': error.text})
+        return jsonify({'error': f'Spoonacular API error: {error.status_code}'}), 500
+
+# Who pays for an upstream call: the logged-in user, otherwise the client address
+def quota_client_key():
+    if not has_request_context():
+        return 'internal'
+    user = session.get('user')
+    if user and user.get('sub'):
+        return f"user:{user['sub']}"
+    return f"addr:{request.remote_addr or 'unknown'}"
+
+# Spend this client's `points` on a Spoonacular call; they are given back when the circuit
+# breaker refuses the call, since nothing reached Spoonacular
+def spoonacular_get(url, params, points):
+    client_key = quota_client_key()
+    spoonacular_quota.admit(client_key, points)
+    try:
+        return spoonacular.get(url, params=params)
+    except CircuitOpen:
+        spoonacular_quota.refund(client_key, points)
+        raise
+
+# Identical concurrent upstream calls in this worker share a single request;
+# waiters give up after UPSTREAM_COALESCE_TIMEOUT seconds
+UPSTREAM_COALESCE_TIMEOUT = float(os.getenv("UPSTREAM_COALESCE_TIMEOUT", "35"))
+upstream_flight = SingleFlight()
+
+# Fetch one complexSearch page, serving repeated searches from the cache without calling Spoonacular
+def fetch_search_page(params):
+    cache_key = make_cache_key(params)
+    data = recipe_cache.get(cache_key)
+    if data is not None:
+        logger.debug("Serving cached Spoonacular results", extra={'cache_key': cache_key})
+        return data
+
+    def fetch():
+        # A call that finished just before this one started may already have filled the cache
+        cached = recipe_cache.local.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = spoonacular_get(SPOONACULAR_SEARCH_URL, params, estimate_search_points(params))
+        except UpstreamUnavailable:
+            # Fall back to an expired result rather than failing the search
+            stale = recipe_cache.get_stale(cache_key)
+            if stale is None:
+                raise
+            logger.warning("Serving stale Spoonacular results", extra={'cache_key': cache_key})
+            return stale
+
+        logger.info("Spoonacular search", extra={'status': response.status_code})
+        if response.status_code == 402:
+            spoonacular_quota.record_quota_exceeded()
+        if response.status_code != 200:
+            stale = recipe_cache.get_stale(cache_key) if response.status_code == 402 or response.status_code >= 500 else None
+            if stale is None:
+                raise SpoonacularError(response.status_code, response.text)
+            logger.warning("Serving stale Spoonacular results", extra={'cache_key': cache_key})
+            return stale
+
+        fetched = response.json()
+        recipe_cache.set(cache_key, fetched)
+        recipe_corpus.add_recipes(fetched.get('results', []))
+        return fetched
+
+    return upstream_flight.do(f"search:{cache_key}", fetch, timeout=UPSTREAM_COALESCE_TIMEOUT)
+
+# Full recipe information from the local corpus, or from Spoonacular on a miss
+def fetch_recipe_detail(recipe_id):
+    recipe = recipe_corpus.get(recipe_id)
+    if recipe is not None:
+        return recipe
+
+    def fetch():
+        response = spoonacular_get(
+            SPOONACULAR_INFORMATION_URL.format(recipe_id=recipe_id),
+            {'apiKey': SPOONACULAR_API_KEY, 'includeNutrition': 'true'},
+            SPOONACULAR_INFORMATION_POINTS
+        )
+        logger.info("Spoonacular information", extra={'status': response.status_code, 'recipe_id': recipe_id})
+        if response.status_code == 402:
+            spoonacular_quota.record_quota_exceeded()
+        if response.status_code != 200:
+            raise SpoonacularError(response.status_code, response.text)
+
+        fetched = response.json()
+        recipe_corpus.add_recipes([fetched])
+        return fetched
+
+    return upstream_flight.do(f"information:{recipe_id}", fetch, timeout=UPSTREAM_COALESCE_TIMEOUT)
+
+# Full recipes for several ids: one batched corpus lookup, then one informationBulk
+# call for any that are missing; failures leave those ids out
+def fetch_recipes(recipe_ids):
+    recipes = recipe_corpus.get_many(recipe_ids)
+    missing = sorted(set(recipe_ids) - set(recipes))
+    if not missing or not SPOONACULAR_API_KEY:
+        return recipes
+
+    def fetch():
+        response = spoonacular_get(SPOONACULAR_BULK_URL, {
+            'apiKey': SPOONACULAR_API_KEY,
+            'ids': ','.join(str(recipe_id) for recipe_id in missing),
+            'includeNutrition': 'true'
+        }, estimate_bulk_information_points(len(missing)))
+        logger.info("Spoonacular informationBulk", extra={'status': response.status_code, 'count': len(missing)})
+        if response.status_code == 402:
+            spoonacular_quota.record_quota_exceeded()
+        if response.status_code != 200:
+            raise SpoonacularError(response.status_code, response.text)
+
+        fetched = response.json()
+        recipe_corpus.add_recipes(fetched)
+        return fetched
+
+    try:
+        key = 'bulk:' + ','.join(str(recipe_id) for recipe_id in missing)
+        for recipe in upstream_flight.do(key, fetch, timeout=UPSTREAM_COALESCE_TIMEOUT):
+            recipes[recipe['id']] = recipe
+    except (SpoonacularError, UpstreamUnavailable, SingleFlightTimeout) as e:
+        logger.warning("Could not fetch recipes: %s", e, extra={'recipe_ids': missing})
+    return recipes
+
+# Page through complexSearch and yield, one list per upstream page, the recipes that pass the
+# local ingredient filter until `wanted` recipes have been found or the page budget runs out
+def iter_search_pages(params, filter_ingredients, wanted):
+    seen_ids = set()
+    offset = 0
+    fetched = 0
+    matched = 0
+
+    for page in range(SPOONACULAR_PAGE_BUDGET):
+        remaining = wanted - matched
+        pass_rate = matched / fetched if fetched else (1.0 if not filter_ingredients else 0.5)
+        page_size = min(max(math.ceil(remaining / max(pass_rate, 0.1)), SPOONACULAR_MIN_PAGE_SIZE), MAX_RECIPES)
+
+        try:
+            data = fetch_search_page(dict(params, offset=offset, number=page_size))
+        except (SpoonacularError, UpstreamUnavailable) as e:
+            # Keep what earlier pages produced rather than failing the whole search
+            if page == 0:
+                raise
+            logger.warning("Stopping search paging: %s", e, extra={'page': page})
+            return
+
+        results = data.get('results', [])
+        new_recipes = [recipe for recipe in results if recipe.get('id') not in seen_ids]
+        seen_ids.update(recipe.get('id') for recipe in new_recipes)
+        fetched += len(new_recipes)
+
+        with phase('filter'):
+            passed = ingredient_matcher.filter_recipes(new_recipes, filter_ingredients)[:wanted - matched]
+        if passed:
+            matched += len(passed)
+            yield passed
+            if matched >= wanted:
+                return
+
+        offset += len(results)
+        if len(results) < page_size or offset >= data.get('totalResults', offset):
+            return
+
+# Opt-in streaming of /recipes: `stream=1` or an Accept header preferring NDJSON
+def wants_ndjson():
+    if request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+# One JSON document per line, written a batch at a time as each batch is produced; a failure
+# part-way through ends the stream with an error line since the status has already been sent
+def ndjson_response(batches):
+    def generate():
+        try:
+            for batch in batches:
+                yield b''.join(dumps_bytes(item) + b'\n' for item in batch)
+        except Exception:
+            logger.exception("Error while streaming recipes")
+            yield dumps_bytes({'error': 'Recipe search was interrupted. Please try again.'}) + b'\n'
+    return app.response_class(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
 
 # Main API endpoint to search for recipes
 @app.route("/recipes", methods=["GET"])
@@ -127,7 +570,7 @@ def get_recipes():
     try:
         # Validate Spoonacular API key
         if not SPOONACULAR_API_KEY:
-            print("No Spoonacular API key found!")
+            logger.error("No Spoonacular API key found")
             return jsonify({'error': 'API key not configured'}), 500
 
         # Get search parameters from query string
@@ -138,18 +581,16 @@ def get_recipes():
         intolerances = request.args.get('intolerances', '')
         max_ready_time = request.args.get('maxReadyTime', '')
         recipe_type = request.args.get('type', '')
-        user_requested_number = int(request.args.get('number', '6'))
-        fetch_limit = 50
+        user_requested_number = min(max(int(request.args.get('number', '6')), 1), MAX_RECIPES)
+        fields = requested_recipe_fields(request.args.get('fields', ''))
+        stream = wants_ndjson()
 
         # Check if we have either ingredients or query
         if not ingredients and not query:
             return jsonify({'error': 'No ingredients or search query provided'}), 400
 
-        search_url = 'https://api.spoonacular.com/recipes/complexSearch'
-        
         params = {
             'apiKey': SPOONACULAR_API_KEY,
-            'number': fetch_limit,
             'addRecipeInformation': 'true',
             'fillIngredients': 'true',
             'addRecipeNutrition': 'true',
@@ -159,6 +600,7 @@ def get_recipes():
         }
         
         # Add ingredients or query parameter
+        requested_ingredients = []
         if ingredients:
             requested_ingredients = [
                 ingred.strip().lower() for ingred in ingredients.split(',') if ingred.strip()
@@ -180,150 +622,189 @@ def get_recipes():
             params['maxReadyTime'] = max_ready_time
         if recipe_type:
             params['type'] = recipe_type
-        
-        response = requests.get(search_url, params=params, timeout=30)
-        
-        print(f"Spoonacular response status: {response.status_code}")
-        
-        # Check if the response is successful
-        if response.status_code == 200:
-            data = response.json()
-            recipes = data.get('results', [])
-
-            if ingredients:
-                remaining_ingredients = requested_ingredients[1:]
-    
-                filter = recipes
 
-                for i, req_ingredient in enumerate(remaining_ingredients):
-                    strict_filtering = []
-                    for recipe in filter:
-                        recipe_ingredients = set(
-                            ingred['name'].strip().lower()
-                            for ingred in recipe.get('extendedIngredients', [])
-                        )
-                        if fuzzy_match(req_ingredient, recipe_ingredients):
-                            strict_filtering.append(recipe)
+        # Answer ingredient searches from the local corpus when it already holds enough matches;
+        # intolerances cannot be checked locally so those searches always go upstream
+        if requested_ingredients and not intolerances:
+            local_needed = max(user_requested_number, CORPUS_MIN_RESULTS)
+            local_recipes = recipe_corpus.search(
+                requested_ingredients,
+                cuisine=cuisine,
+                diet=diet,
+                max_ready_time=max_ready_time,
+                recipe_type=recipe_type,
+                limit=local_needed
+            )
+            # With the point budget nearly spent, any local matches beat an upstream call
+            if len(local_recipes) >= local_needed or (local_recipes and spoonacular_quota.degraded()):
+                local_recipes = local_recipes[:user_requested_number]
+                logger.info("Returning recipes", extra={'count': len(local_recipes), 'source': 'corpus'})
+                local_results = attach_recipe_stats([project_recipe(recipe, fields) for recipe in local_recipes], fields)
+                return ndjson_response([local_results]) if stream else jsonify(local_results)
 
-                    filter = strict_filtering
+        # The first ingredient is matched upstream; the rest are fuzzy-matched locally
+        try:
+            pages = iter_search_pages(params, requested_ingredients[1:], user_requested_number)
+            # Pull the first page eagerly so a failed search still gets an error status
+            first = next(pages, None)
+            if first is not None:
+                pages = itertools.chain([first], pages)
+            if not stream:
+                recipes = [recipe for page in pages for recipe in page]
+        except SpoonacularError as e:
+            return spoonacular_error_response(e)
+        except UpstreamUnavailable as e:
+            return upstream_unavailable_response(e)
+        except SingleFlightTimeout:
+            logger.warning("Timed out waiting for a coalesced Spoonacular search")
+            return jsonify({'error': 'Recipe search timed out. Please try again.'}), 504
 
-                    if not filter:
-                        break
+        if stream:
+            # Each upstream page is written as soon as it is filtered, with one batched stats lookup
+            return ndjson_response(
+                attach_recipe_stats([project_recipe(recipe, fields) for recipe in page], fields) for page in pages
+            )
 
-                recipes = filter
-            
-            if len(recipes) == 0:
-                return jsonify([])
+        processed_recipes = attach_recipe_stats([project_recipe(recipe, fields) for recipe in recipes], fields)
+        logger.info("Returning recipes", extra={'count': len(processed_recipes), 'source': 'spoonacular'})
+        return jsonify(processed_recipes)
             
-            # Process and normalize the recipe data for a consistent frontend display
-            processed_recipes = []
-            for i, recipe in enumerate(recipes):                
-                nutrition_data = recipe.get('nutrition', {})
-                nutrients = nutrition_data.get('nutrients', [])
-                
-                calories = 0
-                for nutrient in nutrients:
-                    if nutrient.get('name') == 'Calories':
-                        calories = nutrient.get('amount', 0)
-                        break
-                
-                image_url = recipe.get('image', '')
-                if not image_url and recipe.get('id'):
-                    image_url = f"https://spoonacular.com/recipeImages/{recipe['id']}-312x231.jpg"
-                
-                # Process the recipe data to ensure all fields are present
-                processed_recipe = {
-                    'id': recipe.get('id'),
-                    'title': recipe.get('title', f'Recipe {recipe.get("id", "")}'),
-                    'image': image_url,
-                    'calories': int(calories) if calories else recipe.get('calories', 0),
-                    'spoonacularScore': recipe.get('spoonacularScore', 60),
-                    'cuisines': recipe['cuisines'] if recipe.get('cuisines') else [],
-                    'readyInMinutes': recipe.get('readyInMinutes', 30),
-                    'servings': recipe.get('servings', 4),
-                    'vegetarian': recipe.get('vegetarian', False),
-                    'vegan': recipe.get('vegan', False),
-                    'glutenFree': recipe.get('glutenFree', False),
-                    'dairyFree': recipe.get('dairyFree', False),
-                    'dishTypes': recipe.get('dishTypes', ['main course']),
-                    'extendedIngredients': recipe.get('extendedIngredients', []),
-                    'analyzedInstructions': recipe.get('analyzedInstructions', []),
-                    'nutrition': nutrition_data,
-                    'usedIngredientCount': recipe.get('usedIngredientCount', 0),
-                    'missedIngredientCount': recipe.get('missedIngredientCount', 0),
-                    'likes': recipe.get('aggregateLikes', 0)
-                }
-                
-                processed_recipes.append(processed_recipe)
-            
-            print(f"Returning {len(processed_recipes)} processed recipes")
-            return jsonify(processed_recipes)
-        
-        # Error handling for Spoonacular API responses
-        elif response.status_code == 402:
-            print("Spoonacular API quota exceeded")
-            return jsonify({'error': 'API quota exceeded. Please try again later.'}), 402
-        elif response.status_code == 401:
-            print("Spoonacular API authentication failed")
-            return jsonify({'error': 'API authentication failed. Check API key.'}), 401
-        else:
-            print(f"Spoonacular API error: {response.status_code}")
-            print(f"Response text: {response.text}")
-            return jsonify({'error': f'Spoonacular API error: {response.status_code}'}), 500
-            
-    except Exception as e:
-        print(f"Unexpected error in get_recipes: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Unexpected error in get_recipes")
         return jsonify({'error': 'Internal server error'}), 500
 
-# API endpoints for fetching static data like cuisines, diets, intolerances, and meal types
+# API endpoint to get the full details of a single recipe
+@app.route('/api/recipes/<int:recipe_id>', methods=['GET'])
+def get_recipe_detail(recipe_id):
+    try:
+        try:
+            recipe = fetch_recipe_detail(recipe_id)
+        except SpoonacularError as e:
+            if e.status_code == 404:
+                return jsonify({'success': False, 'error': 'Recipe not found'}), 404
+            return spoonacular_error_response(e)
+        except UpstreamUnavailable as e:
+            return upstream_unavailable_response(e)
+        except SingleFlightTimeout:
+            return jsonify({'success': False, 'error': 'Recipe lookup timed out'}), 504
+
+        fields = requested_recipe_fields(request.args.get('fields', '')) if request.args.get('fields') else RECIPE_FIELDS
+        return jsonify({'success': True, 'recipe': project_recipe(recipe, fields)})
+
+    except Exception:
+        logger.exception("Error fetching recipe", extra={'recipe_id': recipe_id})
+        return jsonify({'success': False, 'error': 'Failed to fetch recipe'}), 500
+
+# API endpoints for fetching static data like cuisines, diets, intolerances, and meal types;
+# the bodies are serialized once at import and revalidated by ETag
+
+CUISINES = [
+    "African", "Asian", "American", "British", "Cajun", "Caribbean", "Chinese", 
+    "Eastern European", "European", "French", "German", "Greek", "Indian", 
+    "Irish", "Italian", "Japanese", "Jewish", "Korean", "Latin American", 
+    "Mediterranean", "Mexican", "Middle Eastern", "Nordic", "Southern", 
+    "Spanish", "Thai", "Vietnamese"
+]
+DIETS = [
+    "gluten free", "ketogenic", "vegetarian", "lacto-vegetarian", 
+    "ovo-vegetarian", "vegan", "pescetarian", "paleo", "primal", 
+    "low fodmap", "whole30"
+]
+INTOLERANCES = [
+    "dairy", "egg", "gluten", "grain", "peanut", "seafood", 
+    "sesame", "shellfish", "soy", "sulfite", "tree nut", "wheat"
+]
+MEAL_TYPES = [
+    "main course", "side dish", "dessert", "appetizer", "salad", 
+    "bread", "breakfast", "soup", "beverage", "sauce", "marinade", 
+    "fingerfood", "snack", "drink"
+]
+
+TAXONOMY_MAX_AGE = int(os.getenv("TAXONOMY_MAX_AGE", "86400"))
+taxonomy_response = PrecomputedResponse({
+    'cuisines': CUISINES,
+    'diets': DIETS,
+    'intolerances': INTOLERANCES,
+    'mealTypes': MEAL_TYPES
+}, max_age=TAXONOMY_MAX_AGE)
+cuisines_response = PrecomputedResponse(CUISINES, max_age=TAXONOMY_MAX_AGE)
+diets_response = PrecomputedResponse(DIETS, max_age=TAXONOMY_MAX_AGE)
+intolerances_response = PrecomputedResponse(INTOLERANCES, max_age=TAXONOMY_MAX_AGE)
+meal_types_response = PrecomputedResponse(MEAL_TYPES, max_age=TAXONOMY_MAX_AGE)
+
+# All filter options in one response, for the frontend's startup
+@app.route('/api/taxonomy')
+def get_taxonomy():
+    return taxonomy_response.response()
 
 @app.route('/api/cuisines')
 def get_cuisines():
-    cuisines = [
-        "African", "Asian", "American", "British", "Cajun", "Caribbean", "Chinese", 
-        "Eastern European", "European", "French", "German", "Greek", "Indian", 
-        "Irish", "Italian", "Japanese", "Jewish", "Korean", "Latin American", 
-        "Mediterranean", "Mexican", "Middle Eastern", "Nordic", "Southern", 
-        "Spanish", "Thai", "Vietnamese"
-    ]
-    return jsonify(cuisines)
+    return cuisines_response.response()
 
 @app.route('/api/diets')
 def get_diets():
-    diets = [
-        "gluten free", "ketogenic", "vegetarian", "lacto-vegetarian", 
-        "ovo-vegetarian", "vegan", "pescetarian", "paleo", "primal", 
-        "low fodmap", "whole30"
-    ]
-    return jsonify(diets)
+    return diets_response.response()
 
 @app.route('/api/intolerances')
 def get_intolerances():
-    intolerances = [
-        "dairy", "egg", "gluten", "grain", "peanut", "seafood", 
-        "sesame", "shellfish", "soy", "sulfite", "tree nut", "wheat"
-    ]
-    return jsonify(intolerances)
+    return intolerances_response.response()
 
 @app.route('/api/meal-types')
 def get_meal_types():
-    meal_types = [
-        "main course", "side dish", "dessert", "appetizer", "salad", 
-        "bread", "breakfast", "soup", "beverage", "sauce", "marinade", 
-        "fingerfood", "snack", "drink"
-    ]
-    return jsonify(meal_types)
+    return meal_types_response.response()
+
+# Most recipes one /api/recipes/state call may ask about
+MAX_STATE_RECIPES = 50
+
+# API endpoint returning the current user's favorite and rating, plus comment count and latest
+# comment, for a page of recipes in one round trip
+@app.route('/api/recipes/state', methods=['GET'])
+def get_recipes_state():
+    try:
+        recipe_ids = list(dict.fromkeys(int(recipe_id) for recipe_id in request.args.get('ids', '').split(',') if recipe_id.strip()))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'ids must be a comma-separated list of recipe ids'}), 400
+    if not recipe_ids:
+        return jsonify({'success': False, 'error': 'ids is required'}), 400
+    if len(recipe_ids) > MAX_STATE_RECIPES:
+        return jsonify({'success': False, 'error': f'At most {MAX_STATE_RECIPES} recipe ids are allowed'}), 400
+
+    try:
+        user = session.get('user')
+        favorited, ratings = set(), {}
+        if user:
+            favorited = Favorite.get_favorited_recipe_ids(user['sub'], recipe_ids)
+            ratings = Review.get_ratings_by_user(user['sub'], recipe_ids)
+        stats = RecipeStats.get_many(recipe_ids)
+        latest_comments = Comment.get_latest_comments(recipe_ids)
+
+        states = {
+            str(recipe_id): {
+                'favorited': recipe_id in favorited,
+                'user_rating': ratings.get(recipe_id),
+                'comment_count': stats.get(recipe_id, EMPTY_RECIPE_STATS)['comment_count'],
+                'latest_comment': latest_comments.get(recipe_id)
+            }
+            for recipe_id in recipe_ids
+        }
+        return jsonify({'success': True, 'states': states})
+    except Exception:
+        logger.exception("Error fetching recipe state")
+        return jsonify({'success': False, 'error': 'Failed to fetch recipe state'}), 500
 
 # API endpoints for comments on recipes
 @app.route('/api/recipes/<int:recipe_id>/comments', methods=['GET'])
 def get_comments(recipe_id):
     try:
-        comments = Comment.get_comments_by_recipe(recipe_id)
-        return jsonify({'success': True, 'comments': comments})
-    except Exception as e:
-        print(f"Error fetching comments: {e}")
+        limit, after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        comments, next_cursor = Comment.get_comments_by_recipe(recipe_id, limit=limit, after=after)
+        return jsonify({'success': True, 'comments': comments, 'next_cursor': next_cursor})
+    except Exception:
+        logger.exception("Error fetching comments")
         return jsonify({'success': False, 'error': 'Failed to fetch comments'}), 500
 
 # API endpoint to create a new comment on a recipe
@@ -352,8 +833,8 @@ def create_comment(recipe_id):
         
         return jsonify({'success': True, 'comment_id': comment_id})
         
-    except Exception as e:
-        print(f"Error creating comment: {e}")
+    except Exception:
+        logger.exception("Error creating comment")
         return jsonify({'success': False, 'error': 'Failed to create comment'}), 500
 
 
@@ -367,42 +848,27 @@ def add_favorite():
     try:
         data = request.get_json()
         recipe_id = data.get('recipeId')
-        recipe_data = data.get('recipe', {})
         
         if not recipe_id:
             return jsonify({'success': False, 'error': 'Recipe ID is required'}), 400
         
         user_id = user['sub']
         
-        # Check if already favorited
-        existing = db.favorites.find_one({
-            'user_id': user_id, 
-            'recipe_id': recipe_id
-        })
-        
-        if existing:
+        # Add to favorites; the unique (user_id, recipe_id) index rejects duplicates
+        try:
+            favorite_id = Favorite.add_favorite(user_id, user['email'], recipe_id)
+        except DuplicateKeyError:
             return jsonify({'success': False, 'error': 'Recipe already favorited'}), 400
-        
-        # Add to favorites
-        favorite_doc = {
-            'user_id': user_id,
-            'user_email': user['email'],
-            'recipe_id': recipe_id,
-            'recipe_data': recipe_data,
-            'created_at': datetime.utcnow()
-        }
-        
-        result = db.favorites.insert_one(favorite_doc)
-        print(f"Added favorite: User {user['email']} favorited recipe {recipe_id}")
+        logger.info("Added favorite", extra={'user': user['email'], 'recipe_id': recipe_id})
         
         return jsonify({
             'success': True, 
-            'favorite_id': str(result.inserted_id),
+            'favorite_id': favorite_id,
             'message': 'Recipe added to favorites'
         })
         
-    except Exception as e:
-        print(f"Error adding favorite: {e}")
+    except Exception:
+        logger.exception("Error adding favorite")
         return jsonify({'success': False, 'error': 'Failed to add favorite'}), 500
 
 # API endpoint to remove a recipe from favorites
@@ -416,23 +882,18 @@ def remove_favorite(recipe_id):
         user_id = user['sub']
         
         # Remove from favorites
-        result = db.favorites.delete_one({
-            'user_id': user_id,
-            'recipe_id': recipe_id
-        })
-        
-        if result.deleted_count == 0:
+        if not Favorite.remove_favorite(user_id, recipe_id):
             return jsonify({'success': False, 'error': 'Favorite not found'}), 404
         
-        print(f"Removed favorite: User {user['email']} unfavorited recipe {recipe_id}")
+        logger.info("Removed favorite", extra={'user': user['email'], 'recipe_id': recipe_id})
         
         return jsonify({
             'success': True,
             'message': 'Recipe removed from favorites'
         })
         
-    except Exception as e:
-        print(f"Error removing favorite: {e}")
+    except Exception:
+        logger.exception("Error removing favorite")
         return jsonify({'success': False, 'error': 'Failed to remove favorite'}), 500
 
 # API endpoint to get user's favorite recipes
@@ -442,45 +903,49 @@ def get_user_favorites():
     if not user:
         return jsonify({'success': False, 'error': 'Authentication required'}), 401
     
+    try:
+        limit, after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
     try:
         user_id = user['sub']
         
-        # Get user's favorites
-        favorites_cursor = db.favorites.find({
-            'user_id': user_id
-        }).sort('created_at', -1)
+        # Get one page of the user's favorites
+        favorites_page, next_cursor = Favorite.get_favorites_by_user(user_id, limit=limit, after=after)
         
+        # Hydrate the page from the shared recipe store in one batch
+        recipes = fetch_recipes([fav['recipe_id'] for fav in favorites_page])
+
         favorites = []
-        for fav in favorites_cursor:
-            # Ensure we're returning recipe data properly
-            recipe_data = fav.get('recipe_data', {})
-            if recipe_data:
-                # Use recipe_data as the base and add metadata
-                favorite_recipe = dict(recipe_data)
-                favorite_recipe['favorited_at'] = fav['created_at'].isoformat() if fav.get('created_at') else None
+        for fav in favorites_page:
+            recipe = recipes.get(fav['recipe_id'])
+            if recipe:
+                favorite_recipe = project_recipe(recipe, RECIPE_LIST_FIELDS)
             else:
-                # Fallback if no recipe_data
+                # Fallback if the recipe could not be loaded
                 favorite_recipe = {
                     'id': fav['recipe_id'],
                     'title': f'Recipe {fav["recipe_id"]}',
                     'image': '/Temp_Image.jpg',
                     'calories': 0,
                     'rating': 3.0,
-                    'cuisines': ['International'],
-                    'favorited_at': fav['created_at'].isoformat() if fav.get('created_at') else None
+                    'cuisines': ['International']
                 }
+            favorite_recipe['favorited_at'] = fav.get('created_at')
             
             favorites.append(favorite_recipe)
         
-        print(f"Retrieved {len(favorites)} favorites for user {user['email']}")
+        logger.info("Retrieved favorites", extra={'user': user['email'], 'count': len(favorites)})
         
         return jsonify({
             'success': True,
-            'favorites': favorites
+            'favorites': favorites,
+            'next_cursor': next_cursor
         })
         
-    except Exception as e:
-        print(f"Error getting favorites: {e}")
+    except Exception:
+        logger.exception("Error getting favorites")
         return jsonify({'success': False, 'error': 'Failed to get favorites'}), 500
 
 # API endpoint to add a review for a recipe
@@ -511,37 +976,21 @@ def add_review():
         
         user_id = user['sub']
         
-        # Check if user already reviewed this recipe
-        existing = db.reviews.find_one({
-            'user_id': user_id,
-            'recipe_id': recipe_id
-        })
-        
-        if existing:
+        # Add review; the unique (user_id, recipe_id) index rejects a second review
+        try:
+            review_id = Review.add_review(user_id, user['email'], recipe_id, recipe_title, rating, review_text)
+        except DuplicateKeyError:
             return jsonify({'success': False, 'error': 'You have already reviewed this recipe'}), 400
-        
-        # Add review
-        review_doc = {
-            'user_id': user_id,
-            'user_email': user['email'],
-            'recipe_id': recipe_id,
-            'recipe_title': recipe_title,
-            'rating': rating,
-            'review': review_text,
-            'created_at': datetime.utcnow()
-        }
-        
-        result = db.reviews.insert_one(review_doc)
-        print(f"Added review: User {user['email']} reviewed recipe {recipe_id} with {rating} stars")
+        logger.info("Added review", extra={'user': user['email'], 'recipe_id': recipe_id, 'rating': rating})
         
         return jsonify({
             'success': True,
-            'review_id': str(result.inserted_id),
+            'review_id': review_id,
             'message': 'Review added successfully'
         })
         
-    except Exception as e:
-        print(f"Error adding review: {e}")
+    except Exception:
+        logger.exception("Error adding review")
         return jsonify({'success': False, 'error': 'Failed to add review'}), 500
 
 # API endpoint to get reviews for a specific recipe by the authenticated user
@@ -551,36 +1000,40 @@ def get_user_reviews():
     if not user:
         return jsonify({'success': False, 'error': 'Authentication required'}), 401
     
+    try:
+        limit, after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
     try:
         user_id = user['sub']
         
-        # Get user's reviews
-        reviews_cursor = db.reviews.find({
-            'user_id': user_id
-        }).sort('created_at', -1)
+        # Get one page of the user's reviews
+        reviews_page, next_cursor = Review.get_reviews_by_user(user_id, limit=limit, after=after)
         
-        reviews = []
-        for review in reviews_cursor:
-            review_data = {
-                'id': str(review['_id']),
+        reviews = [
+            {
+                'id': review['_id'],
                 'recipeId': review['recipe_id'],
                 'recipe_title': review.get('recipe_title', ''),
                 'rating': review['rating'],
                 'review': review['review'],
-                'createdAt': review['created_at'].isoformat() if review.get('created_at') else None,
+                'createdAt': review.get('created_at'),
                 'userEmail': review['user_email']
             }
-            reviews.append(review_data)
+            for review in reviews_page
+        ]
         
-        print(f"Retrieved {len(reviews)} reviews for user {user['email']}")
+        logger.info("Retrieved reviews", extra={'user': user['email'], 'count': len(reviews)})
         
         return jsonify({
             'success': True,
-            'reviews': reviews
+            'reviews': reviews,
+            'next_cursor': next_cursor
         })
         
-    except Exception as e:
-        print(f"Error getting reviews: {e}")
+    except Exception:
+        logger.exception("Error getting reviews")
         return jsonify({'success': False, 'error': 'Failed to get reviews'}), 500
 
 @app.route('/health')
@@ -604,44 +1057,113 @@ def debug_auth():
         'session_keys': list(session.keys())
     })
 
+@app.route('/debug/cache')
+def debug_cache():
+    stats = recipe_cache.stats()
+    stats['upstream_coalescing'] = upstream_flight.stats()
+    stats['compression'] = response_compressor.stats()
+    stats['static_assets'] = static_assets.stats()
+    stats['sessions'] = app.session_interface.stats()
+    return jsonify(stats)
+
+# Counters kept by the caches, upstream clients and quota controller, read at scrape time
+def _cache_counts():
+    stats = recipe_cache.stats()
+    counts = {}
+    for tier in ('local', 'shared'):
+        for event in ('hits', 'misses', 'stale_hits', 'errors', 'evictions'):
+            if stats.get(tier) and event in stats[tier]:
+                counts[(tier, event)] = stats[tier][event]
+    return counts
+
+def _upstream_counts():
+    return {
+        (client.name, event): client.stats()[event]
+        for client in (spoonacular, dex_http)
+        for event in ('requests', 'retries', 'errors', 'rejected')
+    }
+
+metrics_registry.register(GaugeCallback(
+    'recipe_cache_events', 'Recipe cache lookups by tier and outcome', ('tier', 'event'), _cache_counts
+))
+metrics_registry.register(GaugeCallback(
+    'upstream_calls', 'Upstream HTTP calls by service and outcome', ('service', 'event'), _upstream_counts
+))
+metrics_registry.register(GaugeCallback(
+    'spoonacular_available_points', 'Spoonacular points left in the shared budget', (),
+    lambda: {(): spoonacular_quota.stats()['available_points']}
+))
+
+# Prometheus scrape endpoint
+@app.route('/metrics')
+def metrics():
+    return app.response_class(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Hottest functions across the stored request profiles
+@app.route('/debug/profiles')
+def debug_profiles():
+    if not request_profiler.enabled:
+        abort(404)
+    # Always admin-only; with no PROFILE_TOKEN set the profiles can only be read from PROFILE_DIR
+    if not request_profiler.is_admin():
+        return jsonify({'error': 'Forbidden'}), 403
+    terms = [term for term in request.args.get('filter', '').split(',') if term]
+    return jsonify(request_profiler.summary(
+        limit=request.args.get('limit', 25, type=int),
+        terms=terms,
+        endpoint=request.args.get('endpoint')
+    ))
+
+@app.route('/debug/upstream')
+def debug_upstream():
+    return jsonify({
+        'spoonacular': spoonacular.stats(),
+        'spoonacular_quota': spoonacular_quota.stats(),
+        'dex': dex_http.stats()
+    })
+
 @app.route('/debug/dex')
 def debug_dex():
-    """Test Dex connectivity"""
-    try:
-        response = requests.get(f'{DEX_EXTERNAL_HOST}/.well-known/openid_configuration', timeout=5)
-        if response.status_code == 200:
-            config = response.json()
-            return jsonify({
-                'dex_reachable': True,
-                'issuer': config.get('issuer'),
-                'authorization_endpoint': config.get('authorization_endpoint'),
-                'token_endpoint': config.get('token_endpoint')
-            })
-        else:
-            return jsonify({
-                'dex_reachable': False,
-                'status_code': response.status_code,
-                'error': response.text
-            })
-    except Exception as e:
+    """Report the cached Dex discovery metadata"""
+    config = oidc_metadata.metadata()
+    if config:
         return jsonify({
-            'dex_reachable': False,
-            'error': str(e)
+            'dex_reachable': True,
+            'issuer': config.get('issuer'),
+            'authorization_endpoint': config.get('authorization_endpoint'),
+            'token_endpoint': config.get('token_endpoint'),
+            'metadata': oidc_metadata.stats()
         })
+    return jsonify({
+        'dex_reachable': False,
+        'status_code': oidc_metadata.last_status,
+        'error': oidc_metadata.last_error,
+        'metadata': oidc_metadata.stats()
+    })
+
+# Built frontend, loaded into memory once; hashed assets are served as immutable
+static_assets = StaticAssets(
+    os.getenv("STATIC_DIR", "static"),
+    os.getenv("INDEX_HTML", os.path.join("templates", "index.html")),
+    min_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+).load()
 
 @app.route("/app")
 @app.route("/<path:path>")
 def serve_frontend(path: str = ""):
-    if path and os.path.exists(os.path.join('static', path)):
-        return send_from_directory('static', path)
-    return send_from_directory('templates', 'index.html')
+    asset = static_assets.get(path) if path else None
+    if asset is None:
+        asset = static_assets.index
+    if asset is None:
+        abort(404)
+    return asset.response()
 
 if __name__ == '__main__':
-    print("Starting Flask server...")
-    print(f"Spoonacular API Key: {'Set' if SPOONACULAR_API_KEY else 'Missing'}")
-    print(f"MongoDB URI: {MONGO_URI}")
-    print(f"Dex Configuration:")
-    print(f"   Client ID: {DEX_CLIENT_ID}")
-    print(f"   External Host: {DEX_EXTERNAL_HOST}")
-    print(f"   Internal Host: {DEX_INTERNAL_HOST}")
+    logger.info("Starting Flask server", extra={
+        'spoonacular_api_key': 'Set' if SPOONACULAR_API_KEY else 'Missing',
+        'mongo_uri': MONGO_URI,
+        'dex_client_id': DEX_CLIENT_ID,
+        'dex_external_host': DEX_EXTERNAL_HOST,
+        'dex_internal_host': DEX_INTERNAL_HOST
+    })
     app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
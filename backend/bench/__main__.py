@@ -0,0 +1,69 @@
+import argparse
+import platform
+import sys
+import time
+
+from bench.environment import load_app
+from bench.fake_spoonacular import FakeSpoonacular
+from bench.fixtures import load_recipes, make_recipes
+from bench.load import run_load, seed
+from bench.micro import run_micro
+from bench.report import compare, format_report, load_report, save_report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m bench',
+        description='Offline micro-benchmarks and load test of the recipe API'
+    )
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load per run')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the fake Spoonacular adds per call')
+    parser.add_argument('--payload', help='JSON file of recorded complexSearch responses or recipes')
+    parser.add_argument('--mongo', choices=('mock', 'real'), default='mock', help='mongomock, or MONGO_URI')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a metric regresses')
+    parser.add_argument('--verbose', action='store_true', help='show the app log during the load run')
+    args = parser.parse_args(argv)
+
+    recipes = load_recipes(args.payload) if args.payload else make_recipes()
+    fake = FakeSpoonacular(recipes, latency=args.latency).start()
+    try:
+        app_module = load_app(fake.base_url, mongo=args.mongo)
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'config': {
+                'duration': args.duration,
+                'concurrency': args.concurrency,
+                'latency': args.latency,
+                'mongo': args.mongo,
+                'recipes': len(recipes)
+            }
+        }
+        if not args.skip_micro:
+            report['micro'] = run_micro(app_module)
+        if not args.skip_load:
+            seed(app_module, recipes)
+            report['load'] = run_load(
+                app_module, recipes,
+                duration=args.duration,
+                concurrency=args.concurrency,
+                quiet=not args.verbose
+            )
+            report['upstream_requests'] = fake.requests
+    finally:
+        fake.stop()
+
+    regressions = compare(report, load_report(args.baseline), args.tolerance) if args.baseline else None
+    if args.output:
+        save_report(report, args.output)
+    print(format_report(report, regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import importlib
+import os
+import sys
+
+# Spoonacular point budget large enough that a load run is never throttled by the quota controller
+BENCH_DAILY_POINTS = '1000000000'
+
+
+# Import the app configured for an offline run: Spoonacular calls go to `spoonacular_base_url`
+# and, unless mongo is 'real' (MONGO_URI from the environment), MongoDB is an in-memory mongomock
+def load_app(spoonacular_base_url='http://127.0.0.1:9', mongo='mock'):
+    os.environ['SPOONACULAR_API_KEY'] = os.getenv('SPOONACULAR_API_KEY') or 'bench'
+    os.environ['SPOONACULAR_BASE_URL'] = spoonacular_base_url
+    os.environ.setdefault('SPOONACULAR_DAILY_POINTS', BENCH_DAILY_POINTS)
+    os.environ.setdefault('SPOONACULAR_CLIENT_SHARE', '1')
+    os.environ.setdefault('FLASK_SECRET_KEY', 'bench')
+
+    if 'app' in sys.modules:
+        return sys.modules['app']
+    if mongo == 'real':
+        return importlib.import_module('app')
+
+    import mongomock
+    with mongomock.patch(servers=(('mongo', 27017),)):
+        return importlib.import_module('app')
@@ -0,0 +1,106 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import re
+import threading
+import time
+
+from bench.fixtures import load_recipes, make_recipes
+
+INFORMATION_PATH = re.compile(r'^/recipes/(\d+)/information$')
+
+
+# Local stand-in for the Spoonacular endpoints the app calls: complexSearch, informationBulk
+# and information. Every response is delayed by `latency` seconds to model the real API.
+class FakeSpoonacular:
+
+    def __init__(self, recipes=None, latency=0.05, host='127.0.0.1', port=0):
+        self.recipes = recipes if recipes is not None else make_recipes()
+        self.by_id = {recipe['id']: recipe for recipe in self.recipes}
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search(self, query):
+        include = (query.get('includeIngredients') or query.get('query') or [''])[0].lower()
+        matches = [
+            recipe for recipe in self.recipes
+            if not include
+            or include in recipe['title'].lower()
+            or any(include in ingredient['name'] for ingredient in recipe['extendedIngredients'])
+        ]
+        offset = int(query.get('offset', ['0'])[0])
+        number = int(query.get('number', ['10'])[0])
+        return {
+            'results': matches[offset:offset + number],
+            'offset': offset,
+            'number': number,
+            'totalResults': len(matches)
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                time.sleep(fake.latency)
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                information = INFORMATION_PATH.match(url.path)
+
+                if url.path == '/recipes/complexSearch':
+                    self._send(200, fake.search(query))
+                elif url.path == '/recipes/informationBulk':
+                    ids = [int(i) for i in query.get('ids', [''])[0].split(',') if i]
+                    self._send(200, [fake.by_id[i] for i in ids if i in fake.by_id])
+                elif information and int(information.group(1)) in fake.by_id:
+                    self._send(200, fake.by_id[int(information.group(1))])
+                else:
+                    self._send(404, {'status': 'failure', 'message': 'Not found'})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded or synthetic Spoonacular responses locally')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--payload', help='JSON file of recorded complexSearch responses or recipes')
+    args = parser.parse_args()
+
+    recipes = load_recipes(args.payload) if args.payload else None
+    fake = FakeSpoonacular(recipes, latency=args.latency, port=args.port)
+    print(f"Fake Spoonacular listening on {fake.base_url}")
+    fake.server.serve_forever()
@@ -0,0 +1,78 @@
+import json
+import random
+
+# Ingredient and metadata vocabularies the synthetic recipes are drawn from
+INGREDIENTS = [
+    'chicken breast', 'ground beef', 'salmon', 'shrimp', 'tofu', 'eggs', 'butter', 'olive oil',
+    'garlic', 'onion', 'red onion', 'shallot', 'tomato', 'cherry tomatoes', 'potato', 'sweet potato',
+    'carrot', 'celery', 'spinach', 'kale', 'broccoli', 'cauliflower', 'zucchini', 'bell pepper',
+    'jalapeno', 'mushrooms', 'lemon', 'lime', 'ginger', 'soy sauce', 'rice', 'pasta', 'flour',
+    'sugar', 'brown sugar', 'milk', 'heavy cream', 'parmesan cheese', 'cheddar cheese', 'basil',
+    'cilantro', 'parsley', 'thyme', 'rosemary', 'cumin', 'paprika', 'black beans', 'chickpeas',
+    'coconut milk', 'peanut butter'
+]
+CUISINES = ['Italian', 'Mexican', 'Thai', 'Indian', 'American', 'French', 'Japanese', 'Greek']
+DISH_TYPES = ['main course', 'side dish', 'dessert', 'breakfast', 'soup', 'salad']
+
+
+# Deterministic recipes shaped like complexSearch results with recipe information,
+# ingredients and nutrition included
+def make_recipes(count=200, seed=7):
+    rng = random.Random(seed)
+    recipes = []
+    for index in range(count):
+        recipe_id = 100000 + index
+        names = rng.sample(INGREDIENTS, rng.randint(6, 14))
+        recipes.append({
+            'id': recipe_id,
+            'title': f"{rng.choice(CUISINES)} {names[0].title()} {rng.choice(['Bowl', 'Bake', 'Stew', 'Salad', 'Skillet'])}",
+            'image': f"https://img.spoonacular.com/recipes/{recipe_id}-312x231.jpg",
+            'readyInMinutes': rng.choice([15, 20, 30, 45, 60, 90]),
+            'servings': rng.randint(1, 8),
+            'vegetarian': rng.random() < 0.3,
+            'vegan': rng.random() < 0.1,
+            'glutenFree': rng.random() < 0.4,
+            'dairyFree': rng.random() < 0.4,
+            'spoonacularScore': round(rng.uniform(20, 99), 2),
+            'aggregateLikes': rng.randint(0, 5000),
+            'cuisines': [rng.choice(CUISINES)],
+            'dishTypes': rng.sample(DISH_TYPES, 2),
+            'extendedIngredients': [
+                {
+                    'id': 1000 + INGREDIENTS.index(name),
+                    'name': name,
+                    'original': f"{rng.randint(1, 4)} cups {name}",
+                    'amount': rng.randint(1, 4),
+                    'unit': 'cups'
+                }
+                for name in names
+            ],
+            'analyzedInstructions': [{
+                'name': '',
+                'steps': [
+                    {'number': step + 1, 'step': f"Prepare the {name} and cook until done."}
+                    for step, name in enumerate(names[:6])
+                ]
+            }],
+            'nutrition': {
+                'nutrients': [
+                    {'name': 'Calories', 'amount': round(rng.uniform(150, 900), 1), 'unit': 'kcal'},
+                    {'name': 'Fat', 'amount': round(rng.uniform(2, 60), 1), 'unit': 'g'},
+                    {'name': 'Carbohydrates', 'amount': round(rng.uniform(5, 120), 1), 'unit': 'g'},
+                    {'name': 'Protein', 'amount': round(rng.uniform(2, 70), 1), 'unit': 'g'}
+                ]
+            }
+        })
+    return recipes
+
+
+# Recipes recorded from real complexSearch responses: a JSON list of recipes or of response bodies
+def load_recipes(path):
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [data]
+    recipes = []
+    for item in data:
+        recipes.extend(item['results'] if isinstance(item, dict) and 'results' in item else [item])
+    return recipes
@@ -0,0 +1,118 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import io
+import logging
+import random
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+from bench.report import percentile
+
+BENCH_USER = {'sub': 'bench-user', 'email': 'bench@example.com'}
+
+# Ingredient searches the driver cycles through; repeats exercise the recipe caches
+SEARCH_INGREDIENTS = ['garlic', 'spinach', 'salmon', 'rice', 'tomato', 'chicken breast', 'mushrooms', 'lemon']
+
+# Relative share of requests sent to each endpoint
+DEFAULT_MIX = {'recipes': 4, 'favorites': 2, 'reviews': 2, 'comments': 2}
+
+
+# Favorites, reviews, comments and stored recipes for the bench user, written through the models
+def seed(app_module, recipes, count=100):
+    from models import Comment, Favorite, Review
+
+    app_module.recipe_corpus.add_recipes(recipes[:count])
+    for recipe in recipes[:count]:
+        try:
+            Favorite.add_favorite(BENCH_USER['sub'], BENCH_USER['email'], recipe['id'])
+            Review.add_review(BENCH_USER['sub'], BENCH_USER['email'], recipe['id'], recipe['title'], 4, 'Benchmark review')
+        except app_module.DuplicateKeyError:
+            pass
+    Comment.create_comments([
+        {'recipe_id': recipes[i % 10]['id'], 'user_id': BENCH_USER['sub'], 'user_email': BENCH_USER['email'], 'content': f'Comment {i}'}
+        for i in range(count)
+    ])
+
+
+# Session cookie for the bench user, minted by the app's own session interface
+def session_cookie(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = dict(BENCH_USER)
+    cookie_name = app_module.app.config['SESSION_COOKIE_NAME']
+    return cookie_name, client.get_cookie(cookie_name).value
+
+
+def request_path(endpoint, rng, recipes):
+    if endpoint == 'recipes':
+        first, second = rng.sample(SEARCH_INGREDIENTS, 2)
+        return f"/recipes?ingredients={first},{second}&number=6"
+    if endpoint == 'favorites':
+        return '/api/user/favorites?limit=20'
+    if endpoint == 'reviews':
+        return '/api/user/reviews?limit=20'
+    return f"/api/recipes/{recipes[rng.randrange(10)]['id']}/comments?limit=20"
+
+
+# Drive the app over real HTTP from `concurrency` threads for `duration` seconds and summarise
+# the latencies of each endpoint
+def run_load(app_module, recipes, duration=10.0, concurrency=8, mix=None, seed_value=1, quiet=True):
+    mix = mix or DEFAULT_MIX
+    endpoints = [name for name, weight in mix.items() for _ in range(weight)]
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cookie_name, cookie_value = session_cookie(app_module)
+
+    samples = {name: [] for name in mix}
+    errors = {name: 0 for name in mix}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        http = requests.Session()
+        http.cookies.set(cookie_name, cookie_value)
+        while time.monotonic() < deadline:
+            endpoint = rng.choice(endpoints)
+            start = time.perf_counter()
+            try:
+                ok = http.get(base_url + request_path(endpoint, rng, recipes), timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples[endpoint].append(elapsed)
+                if not ok:
+                    errors[endpoint] += 1
+
+    # The app and the server log every request; keep the report readable unless asked otherwise
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    if quiet:
+        logging.getLogger().setLevel(logging.ERROR)
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    started = time.monotonic()
+    with output:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    results = {}
+    for name, latencies in samples.items():
+        latencies.sort()
+        if not latencies:
+            continue
+        results[name] = {
+            'requests': len(latencies),
+            'errors': errors[name],
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+            'p90_ms': round(percentile(latencies, 0.9) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'throughput_rps': round(len(latencies) / elapsed, 2)
+        }
+    return results
@@ -0,0 +1,41 @@
+import timeit
+
+from bench.fixtures import make_recipes
+from bench.report import percentile
+from ingredients import IngredientMatcher, recipe_ingredient_names
+from json_provider import dumps_bytes
+
+
+# Time `fn` over `repeat` rounds of `number` calls; per-call median and p99 in microseconds
+def measure(fn, number=100, repeat=30):
+    rounds = sorted(total / number * 1e6 for total in timeit.repeat(fn, number=number, repeat=repeat))
+    return {
+        'median_us': round(percentile(rounds, 0.5), 2),
+        'p99_us': round(percentile(rounds, 0.99), 2),
+        'calls': number * repeat
+    }
+
+
+# Micro-benchmarks of the per-request CPU work in a recipe search
+def run_micro(app_module, number=100, repeat=30):
+    recipes = make_recipes(50)
+    names = sorted(recipe_ingredient_names(recipes[0]))
+    wanted = ['garlic', 'spinch', 'chiken breast']
+    warm_matcher = IngredientMatcher(threshold=0.7)
+    warm_matcher.filter_recipes(recipes, wanted)
+    projected = [app_module.project_recipe(recipe, app_module.RECIPE_LIST_FIELDS) for recipe in recipes]
+
+    def cold_filter():
+        IngredientMatcher(threshold=0.7).filter_recipes(recipes, wanted)
+
+    benchmarks = {
+        'fuzzy_match': lambda: app_module.fuzzy_match('spinch', names),
+        'filter_recipes_cold_50': cold_filter,
+        'filter_recipes_warm_50': lambda: warm_matcher.filter_recipes(recipes, wanted),
+        'normalize_recipe_50': lambda: [app_module.normalize_recipe(recipe) for recipe in recipes],
+        'project_list_fields_50': lambda: [
+            app_module.project_recipe(recipe, app_module.RECIPE_LIST_FIELDS) for recipe in recipes
+        ],
+        'encode_list_response_50': lambda: dumps_bytes(projected)
+    }
+    return {name: measure(fn, number=number, repeat=repeat) for name, fn in benchmarks.items()}
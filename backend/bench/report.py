@@ -0,0 +1,84 @@
+import json
+import math
+
+# Metrics where a lower value is better; every other compared metric is better when higher
+LOWER_IS_BETTER = ('median_us', 'p99_us', 'p50_ms', 'p90_ms', 'p99_ms', 'mean_ms')
+COMPARED_METRICS = ('median_us', 'p50_ms', 'p99_ms', 'throughput_rps')
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+# Metrics of `report` that are more than `tolerance` (a fraction) worse than in `baseline`
+def compare(report, baseline, tolerance=0.2):
+    regressions = []
+    for section in ('micro', 'load'):
+        current, previous = report.get(section) or {}, baseline.get(section) or {}
+        for name, metrics in current.items():
+            if metrics.get('errors', 0) > (previous.get(name) or {}).get('errors', 0):
+                regressions.append({
+                    'section': section,
+                    'name': name,
+                    'metric': 'errors',
+                    'baseline': (previous.get(name) or {}).get('errors', 0),
+                    'current': metrics['errors'],
+                    'change': 1.0
+                })
+            for metric in COMPARED_METRICS:
+                new, old = metrics.get(metric), (previous.get(name) or {}).get(metric)
+                if not new or not old:
+                    continue
+                change = (new - old) / old if metric in LOWER_IS_BETTER else (old - new) / old
+                if change > tolerance:
+                    regressions.append({
+                        'section': section,
+                        'name': name,
+                        'metric': metric,
+                        'baseline': old,
+                        'current': new,
+                        'change': round(change, 3)
+                    })
+    return regressions
+
+
+def format_report(report, regressions=None):
+    lines = []
+    if report.get('micro'):
+        lines.append(f"{'micro-benchmark':<34}{'median us':>12}{'p99 us':>12}")
+        for name, metrics in sorted(report['micro'].items()):
+            lines.append(f"{name:<34}{metrics['median_us']:>12.1f}{metrics['p99_us']:>12.1f}")
+        lines.append('')
+    if report.get('load'):
+        lines.append(f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+        for name, metrics in sorted(report['load'].items()):
+            lines.append(
+                f"{name:<16}{metrics['requests']:>10}{metrics['errors']:>8}{metrics['p50_ms']:>10.1f}"
+                f"{metrics['p90_ms']:>10.1f}{metrics['p99_ms']:>10.1f}{metrics['throughput_rps']:>10.1f}"
+            )
+        lines.append('')
+    if regressions is not None:
+        if regressions:
+            lines.append(f"{len(regressions)} regression(s):")
+            for item in regressions:
+                lines.append(
+                    f"  {item['section']}/{item['name']} {item['metric']}: "
+                    f"{item['baseline']} -> {item['current']} ({item['change']:+.0%})"
+                )
+        else:
+            lines.append('No regressions against the baseline')
+    return '\n'.join(lines)
@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+# Build a stable cache key from upstream request parameters
+def make_cache_key(params, exclude=('apiKey',)):
+    parts = []
+    for name in sorted(params, key=str.lower):
+        if name in exclude:
+            continue
+        value = params[name]
+        if isinstance(value, (list, tuple)):
+            value = ','.join(str(v) for v in value)
+        parts.append(f"{name.lower()}={str(value).strip().lower()}")
+    return '&'.join(parts)
+
+
+# In-process LRU cache with a maximum size and a per-entry TTL; expired entries
+# are kept for stale_ttl more seconds so they can still be served as a fallback
+class LRUCache:
+
+    def __init__(self, maxsize=256, ttl=600, stale_ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def _lookup(self, key, allow_stale):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, fresh_until, expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        if fresh_until <= now and not allow_stale:
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key, allow_stale=False)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    # Fresh or expired-but-retained value, for use when the source is unavailable
+    def get_stale(self, key):
+        with self._lock:
+            value = self._lookup(key, allow_stale=True)
+            if value is not None:
+                self.stale_hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        fresh_until = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'stale_hits': self.stale_hits
+        }
+
+
+# Cache tier backed by a Mongo collection with a TTL index, shared by all workers;
+# documents outlive their TTL by stale_ttl seconds for stale fallbacks
+class MongoCache:
+
+    def __init__(self, collection, ttl=3600, stale_ttl=0):
+        self.collection = collection
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.stale_hits = 0
+        self._indexed = False
+
+    # Mongo removes documents once their expires_at has passed
+    def ensure_indexes(self):
+        if not self._indexed:
+            self.collection.create_index('expires_at', expireAfterSeconds=0)
+            self._indexed = True
+
+    def _find(self, key, deadline_field):
+        try:
+            return self.collection.find_one({
+                '_id': key,
+                deadline_field: {'$gt': datetime.utcnow()}
+            })
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning("Shared cache read failed: %s", e)
+            return None
+
+    def get(self, key):
+        doc = self._find(key, 'fresh_until')
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc['value']
+
+    def get_stale(self, key):
+        doc = self._find(key, 'expires_at')
+        if doc is None:
+            return None
+        self.stale_hits += 1
+        return doc['value']
+
+    def set(self, key, value, ttl=None):
+        fresh_until = datetime.utcnow() + timedelta(seconds=self.ttl if ttl is None else ttl)
+        try:
+            self.ensure_indexes()
+            self.collection.replace_one(
+                {'_id': key},
+                {
+                    '_id': key,
+                    'value': value,
+                    'fresh_until': fresh_until,
+                    'expires_at': fresh_until + timedelta(seconds=self.stale_ttl)
+                },
+                upsert=True
+            )
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning("Shared cache write failed: %s", e)
+
+    def stats(self):
+        return {
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'stale_hits': self.stale_hits
+        }
+
+
+# Local LRU in front of an optional shared tier; shared hits are promoted locally
+class TwoTierCache:
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def get_stale(self, key):
+        value = self.local.get_stale(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get_stale(key)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        return {
+            'local': self.local.stats(),
+            'shared': self.shared.stats() if self.shared is not None else None
+        }
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from flask import request
+
+from cache import LRUCache
+from metrics import phase
+
+# Streamed mimetypes compressed chunk by chunk, flushing after each so the client can decode
+# every chunk as soon as it arrives
+STREAMED_MIMETYPES = ('application/x-ndjson',)
+
+# Mimetypes worth compressing; images and other binary payloads are already compressed
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/html', 'text/css', 'text/plain',
+    'application/javascript', 'text/javascript', 'image/svg+xml'
+)
+
+
+# Content-Encoding to use for the client's Accept-Encoding, preferring brotli when available
+def negotiate_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+# Negotiated gzip/brotli compression of response bodies above a size threshold; compressed
+# bytes are memoized by body digest so repeated cached payloads are compressed once
+class ResponseCompressor:
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, memo_size=256):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.memo = LRUCache(maxsize=memo_size, ttl=3600)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compress(self, body, encoding):
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = self.memo.get(key)
+        if compressed is None:
+            if encoding == 'br':
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            self.memo.set(key, compressed)
+        return compressed
+
+    # Compress an iterable of chunks, flushing after each so no chunk waits for the next
+    def compress_stream(self, chunks, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, flush = compressor.process, compressor.flush
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            compress, flush = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                self.bytes_in += len(chunk)
+                compressed = compress(chunk) + flush()
+                self.bytes_out += len(compressed)
+                yield compressed
+            tail = compressor.finish() if encoding == 'br' else compressor.flush(zlib.Z_FINISH)
+            self.bytes_out += len(tail)
+            yield tail
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    # after_request hook: compress the response in place when the client accepts it and it is worth it
+    def __call__(self, response):
+        response.vary.add('Accept-Encoding')
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or (response.is_streamed and response.mimetype not in STREAMED_MIMETYPES)
+        ):
+            return response
+
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = self.compress_stream(response.response, encoding)
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        with phase('compression'):
+            compressed = self.compress(body, encoding)
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag names the identity bytes, so the compressed representation carries it as weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        return {
+            'min_size': self.min_size,
+            'gzip_level': self.gzip_level,
+            'brotli_quality': self.brotli_quality if brotli is not None else None,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'memo': self.memo.stats()
+        }
@@ -0,0 +1,143 @@
+from collections import defaultdict
+from datetime import datetime
+import logging
+import re
+import threading
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from ingredients import recipe_ingredient_names
+from metrics import phase
+
+logger = logging.getLogger(__name__)
+
+
+# Persistent store of every recipe seen from Spoonacular, with an in-memory
+# inverted index from canonical ingredient name to recipe ids
+class RecipeCorpus:
+
+    def __init__(self, collection, matcher, sync_interval=60):
+        self.collection = collection
+        self.matcher = matcher
+        self.sync_interval = sync_interval
+        self._index = defaultdict(set)
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._last_sync = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            self._synced_at = None
+            self._last_sync = 0.0
+
+    def _index_recipe(self, recipe_id, names):
+        for name in names:
+            self._index[name].add(recipe_id)
+        self.matcher.add(names)
+
+    # Pull recipes stored by other workers since the last sync into the index
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        query = {}
+        if self._synced_at is not None:
+            query['updated_at'] = {'$gt': self._synced_at}
+        try:
+            docs = self.collection.find(query, {'ingredient_names': 1, 'updated_at': 1})
+            with self._lock:
+                for doc in docs:
+                    self._index_recipe(doc['_id'], doc.get('ingredient_names', []))
+                    if self._synced_at is None or doc['updated_at'] > self._synced_at:
+                        self._synced_at = doc['updated_at']
+        except PyMongoError as e:
+            logger.warning("Recipe corpus sync failed: %s", e)
+
+    # Store recipes from an upstream response and add them to the index
+    def add_recipes(self, recipes):
+        now = datetime.utcnow()
+        operations = []
+        with self._lock:
+            for recipe in recipes:
+                recipe_id = recipe.get('id')
+                if recipe_id is None:
+                    continue
+                names = recipe_ingredient_names(recipe)
+                self._index_recipe(recipe_id, names)
+                operations.append(UpdateOne(
+                    {'_id': recipe_id},
+                    {'$set': {
+                        'recipe': recipe,
+                        'ingredient_names': sorted(names),
+                        'updated_at': now
+                    }},
+                    upsert=True
+                ))
+
+        if not operations:
+            return
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            logger.warning("Recipe corpus write failed: %s", e)
+
+    # Full stored recipe by id, or None
+    def get(self, recipe_id):
+        try:
+            doc = self.collection.find_one({'_id': recipe_id}, {'recipe': 1})
+        except PyMongoError as e:
+            logger.warning("Recipe corpus read failed: %s", e)
+            return None
+        return doc['recipe'] if doc else None
+
+    # Stored recipes for several ids in one query, keyed by id
+    def get_many(self, recipe_ids):
+        try:
+            docs = self.collection.find({'_id': {'$in': list(recipe_ids)}}, {'recipe': 1})
+            return {doc['_id']: doc['recipe'] for doc in docs}
+        except PyMongoError as e:
+            logger.warning("Recipe corpus read failed: %s", e)
+            return {}
+
+    # Ids of recipes containing every requested ingredient
+    def candidate_ids(self, ingredients):
+        self.sync()
+        with self._lock:
+            candidates = None
+            for ingredient in ingredients:
+                matching_ids = set()
+                for name in self.matcher.resolve(ingredient):
+                    matching_ids |= self._index.get(name, set())
+                candidates = matching_ids if candidates is None else candidates & matching_ids
+                if not candidates:
+                    return set()
+        return candidates or set()
+
+    # Stored recipes matching the ingredients and the optional filters
+    def search(self, ingredients, cuisine='', diet='', max_ready_time='', recipe_type='', limit=50):
+        with phase('filter'):
+            ids = self.candidate_ids(ingredients)
+        if not ids:
+            return []
+
+        query = {'_id': {'$in': list(ids)}}
+        if cuisine:
+            query['recipe.cuisines'] = {'$regex': f'^{re.escape(cuisine)}$', '$options': 'i'}
+        if diet:
+            query['recipe.diets'] = diet.lower()
+        if max_ready_time:
+            query['recipe.readyInMinutes'] = {'$lte': int(max_ready_time)}
+        if recipe_type:
+            query['recipe.dishTypes'] = recipe_type.lower()
+
+        try:
+            docs = self.collection.find(query, {'recipe': 1}).sort('recipe.aggregateLikes', -1).limit(limit)
+            return [doc['recipe'] for doc in docs]
+        except PyMongoError as e:
+            logger.warning("Recipe corpus search failed: %s", e)
+            return []
@@ -0,0 +1,26 @@
+from pymongo import MongoClient
+from dotenv import load_dotenv
+import os
+
+from metrics import MongoPhaseListener
+
+load_dotenv()
+
+# Single MongoDB client shared by the whole app; pool and read settings come from the environment
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://mongo:27017/')
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'recipe_app')
+
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=int(os.getenv('MONGO_MAX_POOL_SIZE', '50')),
+    minPoolSize=int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+    maxIdleTimeMS=int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    waitQueueTimeoutMS=int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000')),
+    serverSelectionTimeoutMS=int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    readPreference=os.getenv('MONGO_READ_PREFERENCE', 'primary'),
+    # Charges command round trips to the `mongo` phase of the request being timed
+    event_listeners=[MongoPhaseListener()],
+    # Connect on first use rather than at import, so forked workers each open their own pool
+    connect=False
+)
+db = client[MONGO_DB_NAME]
@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+
+# Gunicorn settings for production, all overridable through the environment.
+# Request handling is dominated by waits on Spoonacular, Dex and MongoDB, so the defaults
+# favour a few processes with many threads each: threads keep the per-process recipe cache,
+# ingredient vocabulary and request coalescing shared across more concurrent requests.
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# sync, threaded (gthread) or gevent; gevent needs the gevent package installed
+WORKER_CLASSES = {'sync': 'sync', 'threaded': 'gthread', 'gthread': 'gthread', 'gevent': 'gevent'}
+worker_class = WORKER_CLASSES[os.getenv('GUNICORN_WORKER_CLASS', 'threaded')]
+
+workers = int(os.getenv('GUNICORN_WORKERS', str(max(2, multiprocessing.cpu_count()))))
+# Matches the default Spoonacular connection pool size so threads do not queue for connections
+threads = int(os.getenv('GUNICORN_THREADS', '10'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Import the app once in the master and fork workers from it. MongoDB connects lazily and HTTP
+# clients replace their sessions after fork, so each worker opens its own pools; background
+# threads do not survive fork and are started per worker in post_fork below.
+# gevent only monkey-patches the standard library once the worker starts, so locks created while
+# importing in the master stay real OS locks; one held across a Mongo cursor fetch (e.g. during
+# RecipeCorpus.sync) would block the whole worker. gevent workers therefore always import the app
+# themselves.
+preload_app = worker_class != 'gevent' and os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers after a jittered number of requests to bound memory growth without
+# restarting them all at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# A search may page Spoonacular several times with retries, so allow well over one upstream call
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '90'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+# Fetch Dex metadata and start its refresher in each worker as soon as it is forked. post_fork runs
+# before gevent patches the worker, so gevent workers start it on their first request instead.
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        return
+    from app import oidc_metadata
+    oidc_metadata.start()
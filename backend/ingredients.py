@@ -0,0 +1,98 @@
+from collections import OrderedDict, defaultdict
+from difflib import SequenceMatcher
+import threading
+
+
+# Canonical form used for ingredient names everywhere they are compared
+def canonical_ingredient(name):
+    return (name or '').strip().lower()
+
+
+# Canonical ingredient names of a Spoonacular recipe
+def recipe_ingredient_names(recipe):
+    names = set()
+    for ingred in recipe.get('extendedIngredients') or []:
+        name = canonical_ingredient(ingred.get('name'))
+        if name:
+            names.add(name)
+    return names
+
+
+# Upper bound of SequenceMatcher.ratio() from the two lengths alone (same as real_quick_ratio)
+def _length_bound(la, lb):
+    length = la + lb
+    return 2.0 * min(la, lb) / length if length else 1.0
+
+
+# Same accept/reject rule as a similarity ratio >= threshold or a substring hit,
+# checking the cheap upper bounds before running the full ratio
+def ingredient_matches(ingredient, name, threshold=0.7):
+    if ingredient in name:
+        return True
+    if _length_bound(len(ingredient), len(name)) < threshold:
+        return False
+    matcher = SequenceMatcher(None, ingredient, name)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+# Vocabulary of canonical ingredient names, bucketed by length, that resolves each
+# requested ingredient once to the set of names it fuzzy-matches
+class IngredientMatcher:
+
+    def __init__(self, threshold=0.7, maxsize=1024):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._by_length = defaultdict(set)
+        self._resolved = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._by_length.get(len(name), ())
+
+    # Add names to the vocabulary, keeping cached resolutions up to date
+    def add(self, names):
+        with self._lock:
+            for name in names:
+                if name in self:
+                    continue
+                self._by_length[len(name)].add(name)
+                # Cached match sets are immutable and replaced, never mutated, because callers
+                # iterate the sets returned by resolve() without holding the lock
+                for ingredient, matches in self._resolved.items():
+                    if ingredient_matches(ingredient, name, self.threshold):
+                        self._resolved[ingredient] = matches | {name}
+
+    # All vocabulary names the ingredient matches, as a frozenset safe to use without the lock
+    def resolve(self, ingredient):
+        with self._lock:
+            matches = self._resolved.get(ingredient)
+            if matches is not None:
+                self._resolved.move_to_end(ingredient)
+                return matches
+
+            matches = set()
+            for length, names in self._by_length.items():
+                if _length_bound(len(ingredient), length) >= self.threshold:
+                    matches.update(name for name in names if ingredient_matches(ingredient, name, self.threshold))
+                elif length > len(ingredient):
+                    matches.update(name for name in names if ingredient in name)
+
+            matches = frozenset(matches)
+            self._resolved[ingredient] = matches
+            if len(self._resolved) > self.maxsize:
+                self._resolved.popitem(last=False)
+            return matches
+
+    # Keep the recipes whose ingredients match every requested ingredient, preserving order
+    def filter_recipes(self, recipes, ingredients):
+        ingredient_sets = [recipe_ingredient_names(recipe) for recipe in recipes]
+        for names in ingredient_sets:
+            self.add(names)
+
+        selected = list(range(len(recipes)))
+        for ingredient in ingredients:
+            matches = self.resolve(ingredient)
+            selected = [i for i in selected if not ingredient_sets[i].isdisjoint(matches)]
+            if not selected:
+                break
+        return [recipes[i] for i in selected]
@@ -0,0 +1,51 @@
+from datetime import date
+import json
+
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+from metrics import phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Types the encoder does not handle natively; datetimes are written as ISO 8601 either way
+def encode_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Compact JSON bytes, through orjson when it is installed
+def dumps_bytes(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=encode_default, separators=(',', ':')).encode('utf-8')
+
+
+# Flask JSON provider that encodes datetimes and ObjectIds itself, so Mongo documents
+# can be returned without converting them first
+class FastJSONProvider(JSONProvider):
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with phase('serialization'):
+            body = dumps_bytes(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
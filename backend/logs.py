@@ -0,0 +1,88 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+# One JSON object per line: time, level, logger, message, any `extra` fields and the traceback
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# QueueHandler that owns its listener thread. Threads do not survive fork, so a process forked
+# after configure_logging (e.g. a gunicorn worker under preload) starts its own listener and
+# queue on its first record instead of filling a queue nobody reads.
+class ProcessQueueHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.stream = stream
+        self.listener = None
+        self._listener_lock = threading.Lock()
+        self._pid = None
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._listener_lock = threading.Lock()
+        self.listener = None
+        self._pid = None
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            output = logging.StreamHandler(self.stream or sys.stderr)
+            output.setFormatter(JsonFormatter())
+            self.listener = logging.handlers.QueueListener(self.queue, output, respect_handler_level=False)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def enqueue(self, record):
+        if self._pid is None:
+            self._ensure_listener()
+        super().enqueue(record)
+
+    # Flush and stop this process's listener at exit
+    def stop(self):
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+
+_handler = None
+
+
+# Route all logging through a queue so request threads never block on the output stream;
+# a background listener thread formats and writes the records
+def configure_logging(level='INFO', stream=None):
+    global _handler
+    if _handler is None:
+        _handler = ProcessQueueHandler(stream)
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(level)
+    return _handler
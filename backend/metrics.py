@@ -0,0 +1,231 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+
+from flask import g, request
+from pymongo import monitoring
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+# Cumulative histogram with fixed buckets, one series per label combination
+class Histogram:
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# Monotonic counter, one series per label combination
+class Counter:
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in values)
+        return lines
+
+
+# Values read from existing stats when /metrics is scraped
+class GaugeCallback:
+
+    def __init__(self, name, help_text, labelnames, collect):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.collect().items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Time spent in each phase of the current request; nested phases are exclusive, so time
+# inside an inner phase is not also counted for the phase around it
+class PhaseTimer:
+
+    def __init__(self):
+        self.totals = {}
+        self._stack = []
+
+    def _add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self._add(parent[0], now - parent[1])
+        self._stack.append([name, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        name, started = self._stack.pop()
+        self._add(name, now - started)
+        if self._stack:
+            self._stack[-1][1] = now
+
+    # Time measured elsewhere (e.g. by a driver callback) that was spent inside the open phase
+    def record(self, name, seconds):
+        self._add(name, seconds)
+        if self._stack:
+            self._add(self._stack[-1][0], -seconds)
+
+
+_current_timer = ContextVar('phase_timer', default=None)
+
+
+def start_request_timer():
+    timer = PhaseTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_request_timer(token):
+    _current_timer.reset(token)
+
+
+# Attribute the enclosed time to `name` in the current request's breakdown; a no-op outside requests
+@contextmanager
+def phase(name):
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    timer.enter(name)
+    try:
+        yield
+    finally:
+        timer.exit()
+
+
+def record_phase(name, seconds):
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+# pymongo command listener charging each command's server round trip to the `mongo` phase
+class MongoPhaseListener(monitoring.CommandListener):
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_phase('mongo', event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record_phase('mongo', event.duration_micros / 1e6)
+
+
+# Flask hooks recording each request's latency and its phase breakdown per endpoint;
+# time not claimed by any phase is reported as the `app` phase
+class RequestMetrics:
+
+    def __init__(self, registry):
+        self.duration = registry.register(Histogram(
+            'http_request_duration_seconds', 'Request latency', ('endpoint', 'method', 'status')
+        ))
+        self.phases = registry.register(Histogram(
+            'http_request_phase_seconds', 'Request time by phase', ('endpoint', 'phase')
+        ))
+
+    # Register before other hooks so migrations and compression fall inside the measured time
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _start(self):
+        timer, token = start_request_timer()
+        g.request_metrics = (time.perf_counter(), timer, token)
+
+    def _finish(self, response):
+        started, timer, _ = g.request_metrics
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.duration.observe(elapsed, endpoint, request.method, str(response.status_code))
+        for name, seconds in timer.totals.items():
+            self.phases.observe(max(seconds, 0.0), endpoint, name)
+        self.phases.observe(max(elapsed - sum(timer.totals.values()), 0.0), endpoint, 'app')
+        return response
+
+    def _teardown(self, error):
+        state = g.pop('request_metrics', None)
+        if state is not None:
+            try:
+                stop_request_timer(state[2])
+            except ValueError:
+                # Teardown ran in a different context than the request (e.g. after streaming)
+                pass
@@ -0,0 +1,171 @@
+from datetime import datetime
+import logging
+import os
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+logger = logging.getLogger(__name__)
+
+# Database that held comments before all collections moved into one database
+LEGACY_COMMENTS_DB = os.getenv('LEGACY_COMMENTS_DB', 'mydatabase')
+
+# Ordered list of (version, description, function); each function receives the application database
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return fn
+    return register
+
+
+# Remove duplicate (user_id, recipe_id) documents, keeping the oldest, so a unique index can be built
+def remove_duplicates(collection):
+    duplicates = collection.aggregate([
+        {'$sort': {'created_at': ASCENDING}},
+        {'$group': {
+            '_id': {'user_id': '$user_id', 'recipe_id': '$recipe_id'},
+            'ids': {'$push': '$_id'},
+            'count': {'$sum': 1}
+        }},
+        {'$match': {'count': {'$gt': 1}}}
+    ])
+    removed = 0
+    for group in duplicates:
+        removed += collection.delete_many({'_id': {'$in': group['ids'][1:]}}).deleted_count
+    return removed
+
+
+@migration(1, 'Create indexes for favorites, reviews, comments and the recipe corpus')
+def create_initial_indexes(db):
+    for collection in (db.favorites, db.reviews):
+        removed = remove_duplicates(collection)
+        if removed:
+            logger.info("Removed duplicate documents", extra={'count': removed, 'collection': collection.name})
+        collection.create_index(
+            [('user_id', ASCENDING), ('recipe_id', ASCENDING)],
+            unique=True,
+            name='user_recipe_unique'
+        )
+        collection.create_index(
+            [('user_id', ASCENDING), ('created_at', DESCENDING)],
+            name='user_created_at'
+        )
+
+    db.comments.create_index(
+        [('recipe_id', ASCENDING), ('created_at', DESCENDING)],
+        name='recipe_created_at'
+    )
+    db.recipes.create_index('updated_at', name='updated_at')
+    db.recipe_cache.create_index('expires_at', expireAfterSeconds=0)
+
+
+@migration(2, 'Add _id tie-breakers to the indexes behind keyset pagination')
+def add_keyset_indexes(db):
+    for collection in (db.favorites, db.reviews):
+        collection.create_index(
+            [('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+            name='user_created_at_id'
+        )
+        if 'user_created_at' in collection.index_information():
+            collection.drop_index('user_created_at')
+
+    db.comments.create_index(
+        [('recipe_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+        name='recipe_created_at_id'
+    )
+    if 'recipe_created_at' in db.comments.index_information():
+        db.comments.drop_index('recipe_created_at')
+
+
+@migration(3, 'Copy comments from the legacy comments database')
+def copy_legacy_comments(db):
+    if LEGACY_COMMENTS_DB == db.name:
+        return
+    legacy_comments = list(db.client[LEGACY_COMMENTS_DB].comments.find())
+    if legacy_comments:
+        try:
+            db.comments.insert_many(legacy_comments, ordered=False)
+        except BulkWriteError:
+            # Comments copied by an earlier, interrupted run are already present
+            pass
+        logger.info("Copied legacy comments", extra={'count': len(legacy_comments), 'database': LEGACY_COMMENTS_DB})
+    add_keyset_indexes(db)
+
+
+@migration(4, 'Drop recipe data embedded in favorites')
+def normalize_favorite_recipes(db):
+    # The embedded copies are whatever clients posted, so they are not promoted into the shared
+    # recipes collection; favorites are hydrated from the corpus or informationBulk instead
+    db.favorites.update_many({'recipe_data': {'$exists': True}}, {'$unset': {'recipe_data': ''}})
+
+
+@migration(5, 'Backfill per-recipe review, comment and favorite counters')
+def backfill_recipe_stats(db):
+    totals = {}
+    pipelines = (
+        (db.reviews, {'review_count': {'$sum': 1}, 'rating_sum': {'$sum': '$rating'}}),
+        (db.comments, {'comment_count': {'$sum': 1}}),
+        (db.favorites, {'favorite_count': {'$sum': 1}})
+    )
+    for collection, counters in pipelines:
+        for group in collection.aggregate([{'$group': {'_id': '$recipe_id', **counters}}]):
+            try:
+                recipe_id = int(group.pop('_id'))
+            except (TypeError, ValueError):
+                continue
+            totals.setdefault(recipe_id, {}).update(group)
+
+    # Counters are replaced rather than incremented so a rerun stays correct
+    operations = [
+        UpdateOne(
+            {'_id': recipe_id},
+            {'$set': {
+                'review_count': counters.get('review_count', 0),
+                'rating_sum': counters.get('rating_sum', 0),
+                'comment_count': counters.get('comment_count', 0),
+                'favorite_count': counters.get('favorite_count', 0),
+                'updated_at': datetime.utcnow()
+            }},
+            upsert=True
+        )
+        for recipe_id, counters in totals.items()
+    ]
+    if operations:
+        db.recipe_stats.bulk_write(operations, ordered=False)
+
+
+@migration(6, 'Add TTL index for server-side sessions')
+def add_session_ttl_index(db):
+    db.sessions.create_index('expires_at', expireAfterSeconds=0, name='expires_at_ttl')
+
+
+@migration(7, 'Add TTL index for per-client quota buckets')
+def add_quota_bucket_ttl_index(db):
+    db.quota_buckets.create_index('expires_at', expireAfterSeconds=0, name='expires_at_ttl')
+
+
+# Apply every migration newer than the ones recorded in schema_migrations
+def run_migrations(db):
+    applied = {doc['_id'] for doc in db.schema_migrations.find({}, {'_id': 1})}
+    newly_applied = []
+    for version, description, fn in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info("Applying migration %s: %s", version, description)
+        fn(db)
+        try:
+            db.schema_migrations.insert_one({
+                '_id': version,
+                'description': description,
+                'applied_at': datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            # Another worker applied it concurrently; migrations are idempotent
+            pass
+        newly_applied.append(version)
+    return newly_applied
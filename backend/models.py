@@ -1,15 +1,66 @@
-from pymongo import MongoClient
+from collections import Counter
 from datetime import datetime
 from bson.objectid import ObjectId
-import os
+from pymongo import UpdateOne
+from database import db
+from pagination import keyset_page
 
-# MongoDB connection setup
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://mongo:27017/mydatabase')
-client = MongoClient(MONGO_URI)
-db = client.mydatabase
-
-# Defines collections for recipes and comments
+# Defines collections for comments, favorites and reviews
 comments_collection = db.comments
+favorites_collection = db.favorites
+reviews_collection = db.reviews
+recipe_stats_collection = db.recipe_stats
+
+# Fields returned for each comment
+COMMENT_FIELDS = {
+    'recipe_id': 1, 'user_id': 1, 'user_email': 1, 'content': 1, 'created_at': 1, 'updated_at': 1
+}
+
+# Counters kept per recipe document in recipe_stats
+RECIPE_STATS_COUNTERS = ('review_count', 'rating_sum', 'comment_count', 'favorite_count')
+
+class RecipeStats:
+
+    # Atomically adjust a recipe's counters, creating its document on first use
+    @staticmethod
+    def increment(recipe_id, **counters):
+        recipe_stats_collection.update_one(
+            {'_id': int(recipe_id)},
+            {'$inc': counters, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    # Adjust the same counter for several recipes in one round trip
+    @staticmethod
+    def increment_many(amounts, counter):
+        operations = [
+            UpdateOne(
+                {'_id': int(recipe_id)},
+                {'$inc': {counter: amount}, '$set': {'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+            for recipe_id, amount in amounts.items() if amount
+        ]
+        if operations:
+            recipe_stats_collection.bulk_write(operations, ordered=False)
+
+    # Stats for each of the given recipes, in one query; recipes without activity are omitted
+    @staticmethod
+    def get_many(recipe_ids):
+        docs = recipe_stats_collection.find({'_id': {'$in': [int(recipe_id) for recipe_id in recipe_ids]}})
+        return {doc['_id']: RecipeStats.summarize(doc) for doc in docs}
+
+    # Public view of a stats document, with the average rating derived from count and sum
+    @staticmethod
+    def summarize(doc):
+        review_count = doc.get('review_count', 0)
+        rating_sum = doc.get('rating_sum', 0)
+        return {
+            'review_count': review_count,
+            'average_rating': round(rating_sum / review_count, 2) if review_count else None,
+            'comment_count': doc.get('comment_count', 0),
+            'favorite_count': doc.get('favorite_count', 0)
+        }
 
 class Comment:
 
@@ -25,25 +76,54 @@ class Comment:
             'updated_at': datetime.utcnow()
         }
         result = comments_collection.insert_one(comment)
+        RecipeStats.increment(recipe_id, comment_count=1)
         return str(result.inserted_id)
+
+    # Create several comments in one round trip
+    @staticmethod
+    def create_comments(comments):
+        now = datetime.utcnow()
+        documents = [
+            {
+                'recipe_id': int(comment['recipe_id']),
+                'user_id': comment['user_id'],
+                'user_email': comment['user_email'],
+                'content': comment['content'],
+                'created_at': now,
+                'updated_at': now
+            }
+            for comment in comments
+        ]
+        if not documents:
+            return []
+        result = comments_collection.insert_many(documents)
+        RecipeStats.increment_many(Counter(doc['recipe_id'] for doc in documents), 'comment_count')
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
     
-    # Get all comments for a specific recipe
-    @staticmethod
-    def get_comments_by_recipe(recipe_id):
-        comments = comments_collection.find({
-            'recipe_id': int(recipe_id)
-        }).sort('created_at', -1)
-        
-        # Convert ObjectId to string for JSON serialization
-        comment_list = []
-        for comment in comments:
-            comment['_id'] = str(comment['_id'])
-            comment['created_at'] = comment['created_at'].isoformat()
-            comment['updated_at'] = comment['updated_at'].isoformat()
-            comment_list.append(comment)
-        
-        return comment_list
+    # Get one page of comments for a specific recipe, newest first, and the cursor of the next page
+    @staticmethod
+    def get_comments_by_recipe(recipe_id, limit=50, after=None):
+        return keyset_page(
+            comments_collection,
+            {'recipe_id': int(recipe_id)},
+            COMMENT_FIELDS,
+            limit,
+            after
+        )
     
+    # The newest comment on each of the given recipes, in one aggregation over the recipe/created_at index
+    @staticmethod
+    def get_latest_comments(recipe_ids):
+        latest = comments_collection.aggregate([
+            {'$match': {'recipe_id': {'$in': [int(recipe_id) for recipe_id in recipe_ids]}}},
+            {'$sort': {'recipe_id': 1, 'created_at': -1, '_id': -1}},
+            {'$group': {'_id': '$recipe_id', 'comment': {'$first': '$$ROOT'}}}
+        ])
+        return {
+            group['_id']: {field: group['comment'][field] for field in ('_id', *COMMENT_FIELDS)}
+            for group in latest
+        }
+
     # Update a comment (only by the original user who created it)
     @staticmethod
     def update_comment(comment_id, user_id, content):
@@ -64,8 +144,92 @@ class Comment:
     # Delete a comment (only by the original user)
     @staticmethod
     def delete_comment(comment_id, user_id):
-        result = comments_collection.delete_one({
-            '_id': ObjectId(comment_id),
-            'user_id': user_id
+        comment = comments_collection.find_one_and_delete(
+            {'_id': ObjectId(comment_id), 'user_id': user_id},
+            projection={'recipe_id': 1}
+        )
+        if comment is None:
+            return False
+        RecipeStats.increment(comment['recipe_id'], comment_count=-1)
+        return True
+
+
+# Fields returned for each favorite and review
+FAVORITE_FIELDS = {'recipe_id': 1, 'created_at': 1}
+REVIEW_FIELDS = {
+    'recipe_id': 1, 'recipe_title': 1, 'rating': 1, 'review': 1, 'created_at': 1, 'user_email': 1
+}
+
+class Favorite:
+
+    # Add a favorite; raises DuplicateKeyError if the user already favorited the recipe.
+    # Only the recipe id is stored; recipe data lives once in the shared recipes collection
+    @staticmethod
+    def add_favorite(user_id, user_email, recipe_id):
+        favorite = {
+            'user_id': user_id,
+            'user_email': user_email,
+            'recipe_id': recipe_id,
+            'created_at': datetime.utcnow()
+        }
+        result = favorites_collection.insert_one(favorite)
+        RecipeStats.increment(recipe_id, favorite_count=1)
+        return str(result.inserted_id)
+
+    # Remove a favorite, returning whether one existed
+    @staticmethod
+    def remove_favorite(user_id, recipe_id):
+        result = favorites_collection.delete_one({
+            'user_id': user_id,
+            'recipe_id': recipe_id
         })
-        return result.deleted_count > 0
\ No newline at end of file
+        if not result.deleted_count:
+            return False
+        RecipeStats.increment(recipe_id, favorite_count=-1)
+        return True
+
+    # Get one page of a user's favorites, newest first, and the cursor of the next page
+    @staticmethod
+    def get_favorites_by_user(user_id, limit=50, after=None):
+        return keyset_page(favorites_collection, {'user_id': user_id}, FAVORITE_FIELDS, limit, after)
+
+    # Which of the given recipes the user has favorited, in one query
+    @staticmethod
+    def get_favorited_recipe_ids(user_id, recipe_ids):
+        docs = favorites_collection.find(
+            {'user_id': user_id, 'recipe_id': {'$in': list(recipe_ids)}},
+            {'recipe_id': 1, '_id': 0}
+        )
+        return {doc['recipe_id'] for doc in docs}
+
+class Review:
+
+    # Add a review; raises DuplicateKeyError if the user already reviewed the recipe
+    @staticmethod
+    def add_review(user_id, user_email, recipe_id, recipe_title, rating, review_text):
+        review = {
+            'user_id': user_id,
+            'user_email': user_email,
+            'recipe_id': recipe_id,
+            'recipe_title': recipe_title,
+            'rating': rating,
+            'review': review_text,
+            'created_at': datetime.utcnow()
+        }
+        result = reviews_collection.insert_one(review)
+        RecipeStats.increment(recipe_id, review_count=1, rating_sum=rating)
+        return str(result.inserted_id)
+
+    # Get one page of a user's reviews, newest first, and the cursor of the next page
+    @staticmethod
+    def get_reviews_by_user(user_id, limit=50, after=None):
+        return keyset_page(reviews_collection, {'user_id': user_id}, REVIEW_FIELDS, limit, after)
+
+    # The user's rating for each of the given recipes they reviewed, in one query
+    @staticmethod
+    def get_ratings_by_user(user_id, recipe_ids):
+        docs = reviews_collection.find(
+            {'user_id': user_id, 'recipe_id': {'$in': list(recipe_ids)}},
+            {'recipe_id': 1, 'rating': 1, '_id': 0}
+        )
+        return {doc['recipe_id']: doc['rating'] for doc in docs}
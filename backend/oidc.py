@@ -0,0 +1,161 @@
+import logging
+import os
+import re
+import threading
+import time
+
+from authlib.integrations.flask_client import FlaskOAuth2App
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+# Discovery document and JWKS of an OIDC provider, shared by every request in the process.
+# Both are loaded at startup and refreshed by a background thread at `refresh_ahead` of their
+# lifetime (the JWKS response's max-age, else `ttl`). Concurrent fetches are coalesced, and
+# refetches forced by an unknown key id happen at most once per `min_refetch_interval`.
+class OIDCMetadataCache:
+
+    def __init__(self, http, discovery_url, jwks_uri=None, ttl=3600, refresh_ahead=0.8,
+                 retry_interval=30, min_refetch_interval=30):
+        self.http = http
+        self.discovery_url = discovery_url
+        self.jwks_uri = jwks_uri
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.discovery = {}
+        self.keys = None
+        self.loaded_at = None
+        self.expires_at = 0.0
+        self.last_error = None
+        self.last_status = None
+        self.refreshes = 0
+        self.forced_refetches = 0
+        self.errors = 0
+        self._last_forced = 0.0
+        self._flight = SingleFlight()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _fetch(self, url):
+        response = self.http.get(url)
+        self.last_status = response.status_code
+        response.raise_for_status()
+        return response.json(), response
+
+    def _fetch_keys(self):
+        uri = self.jwks_uri or self.discovery.get('jwks_uri')
+        if not uri:
+            raise RuntimeError('Missing "jwks_uri" in OIDC metadata')
+        keys, response = self._fetch(uri)
+        match = MAX_AGE.search(response.headers.get('Cache-Control', ''))
+        self.keys = keys
+        return int(match.group(1)) if match else self.ttl
+
+    def _refresh(self):
+        try:
+            self.discovery, _ = self._fetch(self.discovery_url)
+            lifetime = min(self._fetch_keys(), self.ttl)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            raise
+        self.refreshes += 1
+        self.last_error = None
+        self.loaded_at = time.time()
+        self.expires_at = time.monotonic() + lifetime
+        return lifetime
+
+    # Fetch discovery and keys now; concurrent callers share one fetch
+    def refresh(self):
+        return self._flight.do('refresh', self._refresh)
+
+    def _run(self):
+        # A worker forked after the startup load waits out what is left of the inherited lifetime
+        delay = max(self.expires_at - time.monotonic(), 0) * self.refresh_ahead if self.keys else 0
+        while True:
+            time.sleep(delay)
+            try:
+                delay = self.refresh() * self.refresh_ahead
+            except Exception as e:
+                logger.warning("OIDC metadata refresh failed: %s", e)
+                delay = self.retry_interval
+
+    # Start the refresher in this process. Threads do not survive fork, so call this after
+    # forking (gunicorn's post_fork hook) rather than in a preloading master.
+    def start(self):
+        if self._pid == os.getpid():
+            return self
+        with self._lock:
+            if self._pid == os.getpid():
+                return self
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='oidc-metadata', daemon=True).start()
+        return self
+
+    def _ensure_loaded(self):
+        self.start()
+        if self.keys is None:
+            self.refresh()
+        elif time.monotonic() >= self.expires_at:
+            # The background refresh is overdue; keep serving the previous keys if this fails too
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("OIDC metadata expired and could not be refreshed: %s", e)
+
+    # Discovery document, or {} while the provider cannot be reached; pages that only need
+    # the configured endpoints (e.g. the login redirect) keep working
+    def metadata(self):
+        try:
+            self._ensure_loaded()
+        except Exception as e:
+            logger.warning("OIDC metadata unavailable: %s", e)
+        return self.discovery
+
+    # JWKS for verifying ID tokens; `force` refetches the keys after an unknown key id
+    def jwk_set(self, force=False):
+        self._ensure_loaded()
+        if force:
+            # Callers arriving while a refetch is in flight wait for its keys
+            self._flight.do('keys', self._refetch_keys)
+        return self.keys
+
+    def _refetch_keys(self):
+        if time.monotonic() - self._last_forced < self.min_refetch_interval:
+            return
+        self._last_forced = time.monotonic()
+        self.forced_refetches += 1
+        self._fetch_keys()
+
+    def stats(self):
+        return {
+            'loaded_at': self.loaded_at,
+            'expires_in': round(max(self.expires_at - time.monotonic(), 0), 1) if self.loaded_at else None,
+            'keys': len(self.keys.get('keys', [])) if self.keys else 0,
+            'refreshes': self.refreshes,
+            'forced_refetches': self.forced_refetches,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'coalescing': self._flight.stats()
+        }
+
+
+# authlib client that takes provider metadata and keys from an OIDCMetadataCache instead of
+# fetching them during login; explicitly configured endpoints take precedence over discovery
+class CachedMetadataOAuth2App(FlaskOAuth2App):
+
+    def __init__(self, *args, metadata_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metadata_cache = metadata_cache
+
+    def load_server_metadata(self):
+        return {**self.metadata_cache.metadata(), **self.server_metadata}
+
+    def fetch_jwk_set(self, force=False):
+        return self.metadata_cache.jwk_set(force=force)
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 100
+
+# Newest first, with _id breaking ties between equal timestamps
+KEYSET_SORT = [('created_at', DESCENDING), ('_id', DESCENDING)]
+
+
+# Opaque token pointing just past the given document
+def encode_cursor(doc):
+    payload = json.dumps({'t': doc['created_at'].isoformat(), 'id': str(doc['_id'])})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['id'])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+# `limit` and `after` query parameters; raises ValueError on bad input
+def page_args(args):
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    after = args.get('after')
+    return min(limit, MAX_PAGE_LIMIT), decode_cursor(after) if after else None
+
+
+# One page of documents ordered by (created_at, _id) descending, plus the cursor of the next page
+def keyset_page(collection, query, projection, limit, after=None):
+    if after is not None:
+        created_at, last_id = after
+        query = {'$and': [query, {'$or': [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': last_id}}
+        ]}]}
+
+    docs = list(collection.find(query, projection).sort(KEYSET_SORT).limit(limit + 1))
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
@@ -0,0 +1,141 @@
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+from flask import g, request
+
+PROFILE_HEADER = 'X-Profile'
+
+
+def _function_label(func):
+    filename, line, name = func
+    return f"{filename}:{line}({name})" if line else name
+
+
+# cProfile of selected requests, written as .prof files to a directory that keeps only the newest
+# `keep` profiles. A request is profiled when it carries the admin token in the X-Profile header or
+# is picked by `sample_rate`. With neither configured no hooks are installed, so there is no overhead.
+class RequestProfiler:
+
+    def __init__(self, directory, sample_rate=0.0, token=None, keep=50):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token or None
+        self.keep = keep
+        # One profile at a time keeps the overhead bounded and avoids competing profilers
+        self._active = threading.Lock()
+        self._stats = {'profiled': 0, 'skipped_busy': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or self.token is not None
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    # Whether the request carries the admin token
+    def is_admin(self):
+        supplied = request.headers.get(PROFILE_HEADER)
+        return self.token is not None and supplied is not None and hmac.compare_digest(supplied, self.token)
+
+    def _selected(self):
+        return self.is_admin() or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _start(self):
+        if not self._selected():
+            return
+        if not self._active.acquire(blocking=False):
+            self._count('skipped_busy')
+            return
+        profile = cProfile.Profile()
+        g.request_profile = (profile, time.perf_counter())
+        profile.enable()
+
+    def _finish(self, response):
+        state = g.pop('request_profile', None)
+        if state is None:
+            return response
+        profile, started = state
+        profile.disable()
+        self._active.release()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        name = self._save(profile, endpoint, elapsed_ms)
+        self._count('profiled')
+        response.headers['X-Profile-Id'] = name
+        return response
+
+    # Release the profiler if the request failed before after_request ran
+    def _teardown(self, error):
+        state = g.pop('request_profile', None)
+        if state is not None:
+            state[0].disable()
+            self._active.release()
+
+    def _save(self, profile, endpoint, elapsed_ms):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', endpoint).strip('_') or 'root'
+        name = f"{time.time_ns()}-{slug}-{elapsed_ms:.0f}ms.prof"
+        profile.dump_stats(os.path.join(self.directory, name))
+        self._rotate()
+        return name
+
+    def profiles(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith('.prof'))
+        except FileNotFoundError:
+            return []
+
+    def _rotate(self):
+        names = self.profiles()
+        for name in names[:max(len(names) - self.keep, 0)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    # Hottest functions by own time across the stored profiles, optionally only those whose
+    # file:line(name) label contains one of the `terms`, and only profiles of `endpoint`
+    def summary(self, limit=25, terms=(), endpoint=None):
+        names = self.profiles()
+        if endpoint:
+            slug = re.sub(r'[^A-Za-z0-9]+', '_', endpoint).strip('_')
+            names = [name for name in names if name.split('-', 2)[1] == slug]
+
+        functions = []
+        if names:
+            stats = pstats.Stats(*(os.path.join(self.directory, name) for name in names))
+            for func, (_, calls, tottime, cumtime, _) in stats.stats.items():
+                label = _function_label(func)
+                if terms and not any(term in label for term in terms):
+                    continue
+                functions.append({
+                    'function': label,
+                    'calls': calls,
+                    'tottime_ms': round(tottime * 1000, 3),
+                    'cumtime_ms': round(cumtime * 1000, 3)
+                })
+            functions.sort(key=lambda entry: entry['tottime_ms'], reverse=True)
+
+        with self._stats_lock:
+            counts = dict(self._stats)
+        return {
+            **counts,
+            'sample_rate': self.sample_rate,
+            'profiles': names,
+            'functions': functions[:limit]
+        }
@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+import logging
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from upstream import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+
+# Spoonacular point cost of a complexSearch call: 1 point plus 0.01 per result,
+# and 0.025 per result for each of the information/ingredients/nutrition add-ons
+def estimate_search_points(params):
+    number = int(params.get('number', 10))
+    addons = sum(
+        1 for name in ('addRecipeInformation', 'fillIngredients', 'addRecipeNutrition')
+        if str(params.get(name, '')).lower() == 'true'
+    )
+    return 1 + 0.01 * number + 0.025 * number * addons
+
+
+# Spoonacular point cost of an informationBulk call: 1 point for the first recipe and 0.5 per additional one
+def estimate_bulk_information_points(count):
+    return 1 + 0.5 * max(count - 1, 0)
+
+
+# Raised when the quota controller refuses to spend Spoonacular points on a call
+class QuotaRejected(UpstreamUnavailable):
+    def __init__(self, reason):
+        super().__init__('spoonacular', reason)
+
+
+# Token bucket whose state lives in one Mongo document so every worker draws from it;
+# updates use optimistic concurrency on a version counter. With `expire_after` the document
+# carries an expires_at for the TTL index, pushed forward on every write.
+class MongoTokenBucket:
+
+    def __init__(self, collection, key, capacity, refill_per_second, max_attempts=5, expire_after=None):
+        self.collection = collection
+        self.key = key
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_attempts = max_attempts
+        self.expire_after = expire_after
+
+    def _fields(self, tokens, now):
+        fields = {'tokens': tokens, 'updated_at': now}
+        if self.expire_after is not None:
+            fields['expires_at'] = now + timedelta(seconds=self.expire_after)
+        return fields
+
+    def _load(self):
+        doc = self.collection.find_one({'_id': self.key})
+        if doc is None:
+            doc = {'_id': self.key, 'version': 0, **self._fields(float(self.capacity), datetime.utcnow())}
+            try:
+                self.collection.insert_one(doc)
+            except DuplicateKeyError:
+                doc = self.collection.find_one({'_id': self.key})
+        return doc
+
+    def _refilled(self, doc, now):
+        elapsed = max(0.0, (now - doc['updated_at']).total_seconds())
+        return min(float(self.capacity), doc['tokens'] + elapsed * self.refill_per_second)
+
+    # Tokens currently available
+    def level(self):
+        return self._refilled(self._load(), datetime.utcnow())
+
+    # Take `amount` tokens if available; False when the bucket is short or contended
+    def try_consume(self, amount):
+        for _ in range(self.max_attempts):
+            doc = self._load()
+            now = datetime.utcnow()
+            tokens = self._refilled(doc, now)
+            if tokens < amount:
+                return False
+            result = self.collection.update_one(
+                {'_id': self.key, 'version': doc['version']},
+                {'$set': self._fields(tokens - amount, now), '$inc': {'version': 1}}
+            )
+            if result.modified_count:
+                return True
+        return False
+
+    # Give back tokens taken for a call that was not made, up to the capacity
+    def refund(self, amount):
+        for _ in range(self.max_attempts):
+            doc = self._load()
+            now = datetime.utcnow()
+            tokens = min(float(self.capacity), self._refilled(doc, now) + amount)
+            result = self.collection.update_one(
+                {'_id': self.key, 'version': doc['version']},
+                {'$set': self._fields(tokens, now), '$inc': {'version': 1}}
+            )
+            if result.modified_count:
+                return
+
+    def drain(self):
+        self._load()
+        self.collection.update_one(
+            {'_id': self.key},
+            {'$set': self._fields(0.0, datetime.utcnow()), '$inc': {'version': 1}}
+        )
+
+
+# Admission control for Spoonacular calls: a shared bucket modelling the daily point
+# budget, per-client buckets holding a fair share of it, and a degraded cache-only
+# mode once the shared budget runs low
+class QuotaController:
+
+    def __init__(self, collection, daily_points=150, client_share=0.2, degraded_fraction=0.1):
+        self.collection = collection
+        self.daily_points = daily_points
+        self.client_share = client_share
+        self.degraded_fraction = degraded_fraction
+        self.budget = MongoTokenBucket(collection, 'spoonacular', daily_points, daily_points / SECONDS_PER_DAY)
+        self.rejected = {}
+
+    # An idle client bucket is full again after a day, so its document can expire then
+    def _client_bucket(self, client_key):
+        capacity = self.daily_points * self.client_share
+        return MongoTokenBucket(
+            self.collection, f"client:{client_key}", capacity, capacity / SECONDS_PER_DAY,
+            expire_after=SECONDS_PER_DAY
+        )
+
+    def _reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        raise QuotaRejected(reason)
+
+    # True when the shared budget is too low to spend on anything but cache hits
+    def degraded(self):
+        try:
+            return self.budget.level() < self.daily_points * self.degraded_fraction
+        except PyMongoError as e:
+            logger.warning("Quota check failed: %s", e)
+            return False
+
+    # Spend `points` for this client or raise QuotaRejected; a Mongo outage admits the call
+    def admit(self, client_key, points):
+        try:
+            if self.degraded():
+                self._reject('degraded')
+            client_bucket = self._client_bucket(client_key)
+            if not client_bucket.try_consume(points):
+                self._reject('client_limit')
+            if not self.budget.try_consume(points):
+                # The call is not made, so the client's share is not spent
+                client_bucket.refund(points)
+                self._reject('exhausted')
+        except PyMongoError as e:
+            logger.warning("Quota admission failed, allowing call: %s", e)
+
+    # Give back points admitted for a call that was never sent
+    def refund(self, client_key, points):
+        try:
+            self.budget.refund(points)
+            self._client_bucket(client_key).refund(points)
+        except PyMongoError as e:
+            logger.warning("Quota refund failed: %s", e)
+
+    # Spoonacular reported the quota as used up, so the shared budget is empty
+    def record_quota_exceeded(self):
+        try:
+            self.budget.drain()
+        except PyMongoError as e:
+            logger.warning("Quota drain failed: %s", e)
+
+    def stats(self):
+        try:
+            level = round(self.budget.level(), 2)
+        except PyMongoError:
+            level = None
+        return {
+            'daily_points': self.daily_points,
+            'available_points': level,
+            'degraded': level is not None and level < self.daily_points * self.degraded_fraction,
+            'rejected': dict(self.rejected)
+        }
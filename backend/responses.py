@@ -0,0 +1,28 @@
+import hashlib
+
+from flask import Response, request
+
+from json_provider import dumps_bytes
+
+
+# JSON response whose body is serialized once, identified by a strong ETag derived
+# from its bytes; conditional requests carrying that ETag are answered with 304
+class PrecomputedResponse:
+
+    def __init__(self, payload, max_age=86400, mimetype='application/json'):
+        self.body = dumps_bytes(payload)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.max_age = max_age
+        self.mimetype = mimetype
+
+    def _headers(self, response):
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
+
+    # Response for the current request
+    def response(self):
+        # If-None-Match uses weak comparison, which also matches the ETag of a compressed copy
+        if request.if_none_match.contains_weak(self.etag):
+            return self._headers(Response(status=304))
+        return self._headers(Response(self.body, mimetype=self.mimetype))
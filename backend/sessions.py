@@ -0,0 +1,160 @@
+from datetime import datetime
+import logging
+import secrets
+import threading
+
+from flask.sessions import SecureCookieSession, SessionInterface
+from pymongo.errors import PyMongoError
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# Session whose data lives on the server; reuses Flask's modified/accessed tracking.
+# `rev` counts writes so a cached copy can be checked against the revision in the cookie.
+class ServerSession(SecureCookieSession):
+
+    def __init__(self, initial=None, sid=None, rev=0, expires_at=None, new=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.rev = rev
+        self.expires_at = expires_at
+        self.new = new
+        self.replaced_sid = None
+
+    # Move the data to a fresh session id when the session's privilege changes (e.g. at login),
+    # so an id handed out before authentication cannot be used to ride the authenticated session
+    def regenerate(self):
+        if not self.new and self.replaced_sid is None:
+            self.replaced_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.rev = 0
+        self.modified = True
+
+
+# Keeps session data in a Mongo collection with a TTL index and only `<sid>.<rev>` in the cookie.
+# Reads go through a per-process LRU; the cache entry is used only if its revision matches the
+# cookie, so a session written by another worker is reloaded from Mongo. A session deleted by
+# another worker (logout) is still accepted here until the entry's `cache_ttl` runs out, so keep
+# that short. Expiry slides with use,
+# and the expiry is extended at most once per half lifetime, so reads do not turn into writes.
+class MongoSessionInterface(SessionInterface):
+
+    def __init__(self, collection, cache_size=1024, cache_ttl=10):
+        self.collection = collection
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _parse_cookie(value):
+        sid, _, rev = (value or '').rpartition('.')
+        if not sid or not rev.isdigit():
+            return None, None
+        return sid, int(rev)
+
+    def _load(self, sid, rev):
+        now = datetime.utcnow()
+        cached = self.cache.get(sid)
+        if cached is not None and cached[1] == rev and cached[2] > now:
+            return cached
+
+        self._count('reads')
+        try:
+            doc = self.collection.find_one({'_id': sid, 'expires_at': {'$gt': now}})
+        except PyMongoError as e:
+            self._count('errors')
+            logger.warning("Session read failed: %s", e)
+            return None
+        if doc is None:
+            return None
+        record = (doc['data'], doc['rev'], doc['expires_at'])
+        self.cache.set(sid, record)
+        return record
+
+    def open_session(self, app, request):
+        sid, rev = self._parse_cookie(request.cookies.get(self.get_cookie_name(app)))
+        if sid is not None:
+            record = self._load(sid, rev)
+            if record is not None:
+                data, rev, expires_at = record
+                return ServerSession(dict(data), sid=sid, rev=rev, expires_at=expires_at)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def _cookie_options(self, app):
+        return {
+            'domain': self.get_cookie_domain(app),
+            'path': self.get_cookie_path(app),
+            'secure': self.get_cookie_secure(app),
+            'samesite': self.get_cookie_samesite(app),
+            'httponly': self.get_cookie_httponly(app)
+        }
+
+    def _delete(self, sid):
+        self.cache.delete(sid)
+        try:
+            self.collection.delete_one({'_id': sid})
+        except PyMongoError as e:
+            self._count('errors')
+            logger.warning("Session delete failed: %s", e)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.replaced_sid is not None:
+            self._delete(session.replaced_sid)
+
+        if not session:
+            if session.modified and not session.new:
+                self._delete(session.sid)
+                response.delete_cookie(name, **self._cookie_options(app))
+            return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        stale = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if not session.modified and not stale:
+            return
+
+        rev = session.rev + 1 if session.modified else session.rev
+        expires_at = now + lifetime
+        data = dict(session)
+        self._count('writes')
+        try:
+            if session.modified:
+                self.collection.replace_one(
+                    {'_id': session.sid},
+                    {'_id': session.sid, 'data': data, 'rev': rev, 'expires_at': expires_at},
+                    upsert=True
+                )
+            else:
+                self.collection.update_one({'_id': session.sid}, {'$set': {'expires_at': expires_at}})
+        except PyMongoError as e:
+            self._count('errors')
+            logger.warning("Session write failed: %s", e)
+            return
+
+        self.cache.set(session.sid, (data, rev, expires_at))
+        response.set_cookie(
+            name,
+            f"{session.sid}.{rev}",
+            expires=expires_at if session.permanent else None,
+            **self._cookie_options(app)
+        )
+
+    def stats(self):
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'errors': self.errors,
+            'cache': self.cache.stats()
+        }
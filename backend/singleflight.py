@@ -0,0 +1,61 @@
+import threading
+
+
+# Raised to callers that gave up waiting on another thread's in-flight call
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+# Coalesces concurrent calls with the same key so only one of them runs;
+# the other callers wait for its result or exception
+class SingleFlight:
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight call {key}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        return {
+            'in_flight': len(self._calls),
+            'executed': self.executed,
+            'coalesced': self.coalesced
+        }
@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, request
+
+from compression import COMPRESSIBLE_MIMETYPES, brotli, negotiate_encoding
+
+# Vite emits build assets as assets/<name>-<content hash>.<ext>; their URLs change with their content
+HASHED_ASSET = re.compile(r'(^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+# One file held in memory with its identity bytes, precompressed variants and validators
+class StaticAsset:
+
+    def __init__(self, body, mimetype, immutable, min_size=1024):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        self.variants = {}
+        if mimetype in COMPRESSIBLE_MIMETYPES and len(body) >= min_size:
+            # Compressed once at startup, so the highest levels cost nothing per request
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=11)
+
+    def response(self):
+        encoding = negotiate_encoding(request.accept_encodings) if self.variants else None
+        if encoding not in self.variants:
+            encoding = None
+
+        if request.if_none_match.contains_weak(self.etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding] if encoding else self.body, mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.etag, weak=encoding is not None)
+        response.headers['Cache-Control'] = self.cache_control
+        if self.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+# Manifest of the built frontend, read from disk once; requests are answered from memory
+class StaticAssets:
+
+    def __init__(self, root, index_path, min_size=1024):
+        self.root = root
+        self.index_path = index_path
+        self.min_size = min_size
+        self.assets = {}
+        self.index = None
+
+    def _read(self, path, immutable):
+        with open(path, 'rb') as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return StaticAsset(body, mimetype, immutable, self.min_size)
+
+    # Scan the asset directory and the index page; missing directories leave the manifest empty
+    def load(self):
+        assets = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                assets[name] = self._read(path, bool(HASHED_ASSET.search(name)))
+        self.assets = assets
+        self.index = self._read(self.index_path, False) if os.path.isfile(self.index_path) else None
+        return self
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def stats(self):
+        return {
+            'assets': len(self.assets),
+            'bytes': sum(len(asset.body) for asset in self.assets.values()),
+            'precompressed': sum(1 for asset in self.assets.values() if asset.variants),
+            'index_loaded': self.index is not None
+        }
@@ -1,6 +1,16 @@
+import gzip
+import json
 import unittest
-from unittest.mock import patch
-from app import app
+from unittest.mock import MagicMock, patch
+import mongomock
+from datetime import datetime
+
+# Route the app's MongoClients to an in-memory mongomock server
+with mongomock.patch(servers=(('mongo', 27017),)):
+    from app import app, db, ensure_migrations, recipe_cache, recipe_corpus, request_profiler, spoonacular, spoonacular_quota
+from migrations import run_migrations
+from models import RecipeStats
+from pymongo.errors import PyMongoError
 
 class TestApp(unittest.TestCase):
     """test client to simulate HTTP requests & unittest to mock external API calls.
@@ -8,8 +18,14 @@ class TestApp(unittest.TestCase):
 
     def setUp(self):
         self.app = app.test_client()
+        recipe_cache.clear()
+        recipe_cache.shared.collection.delete_many({})
+        recipe_corpus.clear()
+        recipe_corpus.collection.delete_many({})
+        spoonacular.breaker.record_success()
+        spoonacular_quota.collection.delete_many({})
 
-    @patch('app.requests.get')
+    @patch('app.spoonacular.session.get')
     def test_get_recipes(self, mock_get):
         """
         test recipe search endpoint
@@ -54,6 +70,273 @@ class TestApp(unittest.TestCase):
         self.assertGreater(len(data), 0)
         self.assertEqual(data[0]['title'], 'Test Recipe')
 
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_cached(self, mock_get):
+        """
+        test that repeated searches are served from the cache
+
+        verifies that:
+        1. the second identical search does not call Spoonacular
+        2. the shared tier answers after the local tier is cleared
+        3. hit and miss counters are exposed
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'results': [{'id': 2, 'title': 'Cached Recipe', 'extendedIngredients': []}]
+        }
+
+        first = self.app.get('/recipes?ingredients=Pasta')
+        second = self.app.get('/recipes?ingredients=pasta')
+        self.assertEqual(first.get_json(), second.get_json())
+        self.assertEqual(mock_get.call_count, 1)
+
+        recipe_cache.clear()
+        third = self.app.get('/recipes?ingredients=pasta')
+        self.assertEqual(third.get_json()[0]['title'], 'Cached Recipe')
+        self.assertEqual(mock_get.call_count, 1)
+
+        stats = self.app.get('/debug/cache').get_json()
+        self.assertGreaterEqual(stats['local']['hits'], 1)
+        self.assertGreaterEqual(stats['shared']['hits'], 1)
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_from_local_corpus(self, mock_get):
+        """
+        test that ingredient searches are answered from the local corpus
+
+        verifies that:
+        1. recipes received from Spoonacular are stored and indexed
+        2. a later search with enough local matches does not call Spoonacular
+        3. only recipes containing every requested ingredient are returned
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'results': [
+                {
+                    'id': recipe_id,
+                    'title': f'Chicken Rice {recipe_id}',
+                    'extendedIngredients': [{'name': 'Chicken Breast'}, {'name': 'rice'}]
+                }
+                for recipe_id in range(1, 7)
+            ] + [{'id': 99, 'title': 'Plain Rice', 'extendedIngredients': [{'name': 'rice'}]}]
+        }
+
+        self.app.get('/recipes?ingredients=rice')
+        self.assertEqual(mock_get.call_count, 1)
+
+        response = self.app.get('/recipes?ingredients=chicken,rice')
+        self.assertEqual(mock_get.call_count, 1)
+        ids = {recipe['id'] for recipe in response.get_json()}
+        self.assertEqual(ids, set(range(1, 7)))
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_incremental_paging(self, mock_get):
+        """
+        test that upstream pages are fetched until `number` recipes pass the filter
+
+        verifies that:
+        1. pages are requested with increasing offsets
+        2. paging stops as soon as enough recipes have been found
+        3. no more than `number` recipes are returned
+        """
+        def page(url, params, timeout):
+            offset, number = params['offset'], params['number']
+            mock_response = MagicMock(status_code=200)
+            mock_response.json.return_value = {
+                'totalResults': 1000,
+                'results': [
+                    {
+                        'id': recipe_id,
+                        'title': f'Recipe {recipe_id}',
+                        'extendedIngredients': [{'name': 'chicken'}] + (
+                            [{'name': 'garlic'}] if recipe_id % 4 == 0 else []
+                        )
+                    }
+                    for recipe_id in range(offset, offset + number)
+                ]
+            }
+            return mock_response
+
+        mock_get.side_effect = page
+        response = self.app.get('/recipes?ingredients=chicken,garlic&number=6&intolerances=peanut')
+        data = response.get_json()
+
+        self.assertEqual(len(data), 6)
+        self.assertTrue(all(recipe['id'] % 4 == 0 for recipe in data))
+        offsets = [call.kwargs['params']['offset'] for call in mock_get.call_args_list]
+        self.assertEqual(offsets[0], 0)
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertLess(sum(call.kwargs['params']['number'] for call in mock_get.call_args_list), 50)
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_list_projection(self, mock_get):
+        """
+        test the compact list representation and the `fields=` projection
+
+        verifies that:
+        1. heavy detail fields are left out of list results by default
+        2. `fields=` selects the returned fields
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'results': [{
+                'id': 3,
+                'title': 'Heavy Recipe',
+                'extendedIngredients': [{'name': 'beef'}],
+                'analyzedInstructions': [{'steps': [{'step': 'Cook'}]}],
+                'nutrition': {'nutrients': [{'name': 'Calories', 'amount': 250}]}
+            }]
+        }
+
+        recipe = self.app.get('/recipes?ingredients=beef').get_json()[0]
+        self.assertEqual(recipe['calories'], 250)
+        self.assertNotIn('extendedIngredients', recipe)
+        self.assertNotIn('nutrition', recipe)
+
+        recipe = self.app.get('/recipes?ingredients=beef&fields=id,title,nutrition').get_json()[0]
+        self.assertEqual(set(recipe), {'id', 'title', 'nutrition'})
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_streaming(self, mock_get):
+        """
+        test NDJSON streaming of search results
+
+        verifies that:
+        1. `stream=1` and an NDJSON Accept header both produce one recipe per line
+        2. stats are loaded once per upstream page and the stream is gzipped when accepted
+        3. an upstream failure before the first result still returns an error status
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'results': [{'id': 41, 'title': 'First'}, {'id': 42, 'title': 'Second'}],
+            'totalResults': 2
+        }
+
+        with patch('app.RecipeStats.get_many', wraps=RecipeStats.get_many) as get_stats:
+            response = self.app.get('/recipes?query=soup&stream=1')
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([recipe['title'] for recipe in lines], ['First', 'Second'])
+        self.assertIn('stats', lines[0])
+        self.assertEqual(get_stats.call_count, 1)
+
+        compressed = self.app.get('/recipes?query=soup&stream=1', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(compressed.data).splitlines()), 2)
+
+        response = self.app.get('/recipes?query=soup', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(len(response.data.decode().splitlines()), 2)
+
+        recipe_cache.clear()
+        recipe_cache.shared.collection.delete_many({})
+        mock_get.return_value.status_code = 401
+        self.assertEqual(self.app.get('/recipes?query=stew&stream=1').status_code, 401)
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipe_detail(self, mock_get):
+        """
+        test the recipe detail endpoint
+
+        verifies that:
+        1. an unknown recipe is fetched from Spoonacular once
+        2. the full detail is then served from the local corpus
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'id': 4,
+            'title': 'Detail Recipe',
+            'extendedIngredients': [{'name': 'tofu'}],
+            'analyzedInstructions': []
+        }
+
+        first = self.app.get('/api/recipes/4')
+        second = self.app.get('/api/recipes/4')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.get_json()['recipe']['extendedIngredients'], [{'name': 'tofu'}])
+        self.assertEqual(mock_get.call_count, 1)
+
+        mock_get.return_value.status_code = 404
+        self.assertEqual(self.app.get('/api/recipes/5').status_code, 404)
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_stale_when_circuit_open(self, mock_get):
+        """
+        test that expired cached results are served while the circuit is open
+
+        verifies that:
+        1. an open circuit does not call Spoonacular
+        2. the expired result is returned instead of an error
+        3. without a cached result the quota error is reported
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'results': [{'id': 5, 'title': 'Stale Recipe', 'extendedIngredients': []}]
+        }
+        self.app.get('/recipes?query=stew')
+
+        # Expire the cached result in both tiers
+        for key, (value, fresh_until, expires_at) in list(recipe_cache.local._entries.items()):
+            recipe_cache.local._entries[key] = (value, 0, expires_at)
+        recipe_cache.shared.collection.update_many({}, {'$set': {'fresh_until': datetime(2000, 1, 1)}})
+
+        spoonacular.breaker.record_quota_exceeded()
+        response = self.app.get('/recipes?query=stew')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]['title'], 'Stale Recipe')
+        self.assertEqual(mock_get.call_count, 1)
+
+        response = self.app.get('/recipes?query=soup')
+        self.assertEqual(response.status_code, 402)
+
+    @patch('app.spoonacular.session.get')
+    def test_get_recipes_quota_admission(self, mock_get):
+        """
+        test the Spoonacular point budget and per-client fair share
+
+        verifies that:
+        1. a client that used up its share is rejected with 429 without calling Spoonacular
+        2. a nearly empty shared budget switches to cache-only mode
+        3. a 402 from Spoonacular drains the shared budget
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {'results': [{'id': 6, 'title': 'Soup'}]}
+
+        with patch.object(spoonacular_quota, 'client_share', 0.01):
+            response = self.app.get('/recipes?query=soup')
+            self.assertEqual(response.status_code, 429)
+        self.assertEqual(mock_get.call_count, 0)
+
+        spoonacular_quota.collection.delete_many({})
+        spoonacular_quota.budget.drain()
+        response = self.app.get('/recipes?query=soup')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(mock_get.call_count, 0)
+
+        spoonacular_quota.collection.delete_many({})
+        mock_get.return_value.status_code = 402
+        self.assertEqual(self.app.get('/recipes?query=stew').status_code, 402)
+        self.assertTrue(spoonacular_quota.stats()['degraded'])
+
+    @patch('app.spoonacular.session.get')
+    def test_open_circuit_does_not_spend_quota(self, mock_get):
+        """
+        test that calls refused by the circuit breaker give their points back
+
+        verifies that:
+        1. no request reaches Spoonacular while the circuit is open
+        2. the shared budget and the client's share are left full
+        """
+        for _ in range(spoonacular.breaker.failure_threshold):
+            spoonacular.breaker.record_failure()
+        for query in ('soup', 'stew', 'salad', 'curry', 'pie', 'cake'):
+            self.assertEqual(self.app.get(f'/recipes?query={query}').status_code, 503)
+        self.assertEqual(mock_get.call_count, 0)
+
+        self.assertAlmostEqual(spoonacular_quota.budget.level(), spoonacular_quota.daily_points, places=1)
+        client = spoonacular_quota.collection.find_one({'_id': {'$regex': '^client:'}})
+        capacity = spoonacular_quota.daily_points * spoonacular_quota.client_share
+        self.assertAlmostEqual(client['tokens'], capacity, places=1)
+
     def test_get_cuisines(self):
         """
         test cuisines endpoint
@@ -130,6 +413,280 @@ class TestApp(unittest.TestCase):
 
         response = self.app.get('/api/user/favorites') 
 
+    def login(self, client, sub='123', email='test@example.com'):
+        with client.session_transaction() as sess:
+            sess['user'] = {'email': email, 'sub': sub}
+
+    def test_migrations_create_unique_indexes(self):
+        """
+        test the index migration
+
+        verifies that:
+        1. existing duplicate favorites are removed before the unique index is built
+        2. the migration is recorded and not applied twice
+        """
+        db.schema_migrations.delete_many({})
+        db.favorites.drop()
+        db.favorites.insert_many([
+            {'user_id': 'u', 'recipe_id': 1, 'created_at': datetime(2024, 1, 1)},
+            {'user_id': 'u', 'recipe_id': 1, 'created_at': datetime(2024, 1, 2)}
+        ])
+
+        legacy_comments = db.client.mydatabase.comments
+        legacy_comments.insert_one({'recipe_id': 9, 'content': 'old', 'created_at': datetime(2023, 1, 1)})
+
+        # Favorite blobs are client-supplied and must not reach the shared recipes collection
+        db.favorites.insert_one({'user_id': 'v', 'recipe_id': 901, 'recipe_data': {'title': 'Posted'}})
+
+        self.assertEqual(run_migrations(db), [1, 2, 3, 4, 5, 6, 7])
+        self.assertNotIn('recipe_data', db.favorites.find_one({'recipe_id': 901}))
+        self.assertIsNone(db.recipes.find_one({'_id': 901}))
+        db.favorites.delete_many({'user_id': 'v'})
+        self.assertEqual(db.comments.count_documents({'recipe_id': 9}), 1)
+        legacy_comments.drop()
+        db.comments.delete_many({'recipe_id': 9})
+        self.assertEqual(db.favorites.count_documents({}), 1)
+        self.assertIn('user_recipe_unique', db.favorites.index_information())
+        self.assertIn('recipe_created_at_id', db.comments.index_information())
+        self.assertEqual(run_migrations(db), [])
+
+    def test_failed_migrations_are_retried(self):
+        """
+        test that a worker whose first migration run fails tries again later
+
+        verifies that:
+        1. a failure is not recorded as done and is not retried before the retry interval
+        2. the next request after the interval applies the migrations
+        """
+        with patch('app.migrations_done', False), patch('app.migrations_retry_at', 0.0), \
+                patch('app.run_migrations', side_effect=[PyMongoError('down'), [1]]) as mock_run, \
+                patch('app.time.monotonic', return_value=1000):
+            ensure_migrations()
+            ensure_migrations()
+            self.assertEqual(mock_run.call_count, 1)
+            with patch('app.time.monotonic', return_value=2000):
+                ensure_migrations()
+                ensure_migrations()
+            self.assertEqual(mock_run.call_count, 2)
+
+    def test_add_favorite_and_review_once(self):
+        """
+        test that the unique indexes reject a second favorite or review of the same recipe
+        """
+        run_migrations(db)
+        db.favorites.delete_many({})
+        db.reviews.delete_many({})
+        self.login(self.app)
+
+        first = self.app.post('/api/favorites', json={'recipeId': 7, 'recipe': {'id': 7}})
+        second = self.app.post('/api/favorites', json={'recipeId': 7, 'recipe': {'id': 7}})
+        self.assertTrue(first.get_json()['success'])
+        self.assertEqual(second.status_code, 400)
+
+        review = {'recipeId': 7, 'rating': 4, 'review': 'Tasty'}
+        self.assertTrue(self.app.post('/api/reviews', json=review).get_json()['success'])
+        self.assertEqual(self.app.post('/api/reviews', json=review).status_code, 400)
+
+    @patch('app.spoonacular.session.get')
+    def test_recipe_stats(self, mock_get):
+        """
+        test the per-recipe stats maintained by reviews, comments and favorites
+
+        verifies that:
+        1. each write increments its counter on the recipe's stats document
+        2. removing a favorite decrements the favorite count
+        3. /recipes attaches the stats, with empty stats for untouched recipes
+        """
+        db.favorites.delete_many({})
+        db.reviews.delete_many({})
+        db.recipe_stats.delete_many({})
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'results': [{'id': 21, 'title': 'Reviewed'}, {'id': 22, 'title': 'Untouched'}]
+        }
+
+        self.login(self.app)
+        self.app.post('/api/reviews', json={'recipeId': 21, 'rating': 4, 'review': 'Good'})
+        self.app.post('/api/recipes/21/comments', json={'content': 'Nice'})
+        self.app.post('/api/favorites', json={'recipeId': 21})
+        self.app.post('/api/favorites', json={'recipeId': 22})
+        self.app.delete('/api/favorites/22')
+
+        stats = db.recipe_stats.find_one({'_id': 21})
+        self.assertEqual((stats['review_count'], stats['rating_sum']), (1, 4))
+        self.assertEqual((stats['comment_count'], stats['favorite_count']), (1, 1))
+
+        recipes = {recipe['id']: recipe for recipe in self.app.get('/recipes?query=pasta').get_json()}
+        self.assertEqual(recipes[21]['stats'], {
+            'review_count': 1, 'average_rating': 4.0, 'comment_count': 1, 'favorite_count': 1
+        })
+        self.assertEqual(recipes[22]['stats']['favorite_count'], 0)
+        self.assertIsNone(recipes[22]['stats']['average_rating'])
+
+    @patch('app.spoonacular.session.get')
+    def test_metrics(self, mock_get):
+        """
+        test the Prometheus endpoint
+
+        verifies that:
+        1. request latency is recorded per endpoint and status
+        2. the upstream, filter and normalize phases of a search are broken out
+        3. cache and upstream counters are exported
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {'results': [{'id': 51, 'title': 'Metered'}], 'totalResults': 1}
+        self.app.get('/recipes?ingredients=leek,salt')
+
+        body = self.app.get('/metrics').data.decode()
+        self.assertIn('http_request_duration_seconds_count{endpoint="/recipes",method="GET",status="200"} ', body)
+        for name in ('upstream', 'filter', 'normalize', 'serialization', 'app'):
+            self.assertIn(f'http_request_phase_seconds_count{{endpoint="/recipes",phase="{name}"}}', body)
+        self.assertIn('upstream_calls{service="spoonacular",event="requests"}', body)
+        self.assertIn('recipe_cache_events{tier="local",event="misses"}', body)
+
+    def test_debug_profiles_admin_only(self):
+        """
+        test that the profile summary is hidden when profiling is off and admin-only when it is on
+
+        verifies that:
+        1. with profiling disabled the endpoint does not exist
+        2. with only a sample rate configured nobody can read it
+        3. with a token it requires the token and treats the filter as plain text
+        """
+        self.assertEqual(self.app.get('/debug/profiles').status_code, 404)
+        with patch.object(request_profiler, 'sample_rate', 0.5):
+            self.assertEqual(self.app.get('/debug/profiles').status_code, 403)
+        with patch.object(request_profiler, 'token', 'secret'):
+            self.assertEqual(self.app.get('/debug/profiles', headers={'X-Profile': 'wrong'}).status_code, 403)
+            response = self.app.get('/debug/profiles?filter=(a+)+$', headers={'X-Profile': 'secret'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['functions'], [])
+
+    def test_taxonomy(self):
+        """
+        test the precomputed taxonomy endpoint
+
+        verifies that:
+        1. all four filter lists come back in one response with an ETag and Cache-Control
+        2. a matching If-None-Match is answered with an empty 304
+        3. the single-list endpoints still return their lists
+        """
+        response = self.app.get('/api/taxonomy')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(set(data), {'cuisines', 'diets', 'intolerances', 'mealTypes'})
+        self.assertIn('max-age=', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        revalidated = self.app.get('/api/taxonomy', headers={'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+        self.assertEqual(revalidated.headers['ETag'], etag)
+
+        self.assertEqual(self.app.get('/api/cuisines').get_json(), data['cuisines'])
+        self.assertEqual(self.app.get('/api/meal-types').get_json(), data['mealTypes'])
+
+    def test_get_recipes_state(self):
+        """
+        test the batched per-recipe state endpoint
+
+        verifies that:
+        1. favorite status, the user's rating, comment count and latest comment come back per recipe
+        2. anonymous callers get counts and comments without user state
+        3. too many or malformed ids are rejected
+        """
+        for collection in (db.favorites, db.reviews, db.comments, db.recipe_stats):
+            collection.delete_many({})
+        self.login(self.app)
+        self.app.post('/api/favorites', json={'recipeId': 31})
+        self.app.post('/api/reviews', json={'recipeId': 31, 'rating': 5, 'review': 'Great'})
+        self.app.post('/api/recipes/31/comments', json={'content': 'First'})
+        self.app.post('/api/recipes/31/comments', json={'content': 'Second'})
+
+        states = self.app.get('/api/recipes/state?ids=31,32').get_json()['states']
+        self.assertTrue(states['31']['favorited'])
+        self.assertEqual(states['31']['user_rating'], 5)
+        self.assertEqual(states['31']['comment_count'], 2)
+        self.assertEqual(states['31']['latest_comment']['content'], 'Second')
+        self.assertEqual(states['32'], {
+            'favorited': False, 'user_rating': None, 'comment_count': 0, 'latest_comment': None
+        })
+
+        anonymous = app.test_client().get('/api/recipes/state?ids=31').get_json()['states']['31']
+        self.assertFalse(anonymous['favorited'])
+        self.assertEqual(anonymous['comment_count'], 2)
+
+        too_many = ','.join(str(i) for i in range(51))
+        self.assertEqual(self.app.get(f'/api/recipes/state?ids={too_many}').status_code, 400)
+        self.assertEqual(self.app.get('/api/recipes/state?ids=abc').status_code, 400)
+
+    @patch('app.spoonacular.session.get')
+    def test_pagination(self, mock_get):
+        """
+        test keyset pagination of comments and favorites
+
+        verifies that:
+        1. pages follow (created_at, _id) order without gaps or repeats, including equal timestamps
+        2. the last page has no next cursor
+        3. an invalid cursor is rejected
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = []
+        db.comments.delete_many({})
+        db.favorites.delete_many({})
+        for i in range(5):
+            created_at = datetime(2024, 1, 1 + i // 2)
+            db.comments.insert_one({
+                'recipe_id': 8, 'user_id': 'u', 'user_email': 'u@example.com', 'content': f'c{i}',
+                'created_at': created_at, 'updated_at': created_at
+            })
+            db.favorites.insert_one({'user_id': '123', 'recipe_id': i, 'recipe_data': {'id': i}, 'created_at': created_at})
+
+        contents, after = [], ''
+        while True:
+            data = self.app.get(f'/api/recipes/8/comments?limit=2&after={after}').get_json()
+            contents += [comment['content'] for comment in data['comments']]
+            if not data['next_cursor']:
+                break
+            after = data['next_cursor']
+        self.assertEqual(sorted(contents), [f'c{i}' for i in range(5)])
+        self.assertEqual(len(contents), 5)
+
+        self.login(self.app)
+        first = self.app.get('/api/user/favorites?limit=3').get_json()
+        second = self.app.get(f"/api/user/favorites?limit=3&after={first['next_cursor']}").get_json()
+        self.assertEqual(len(first['favorites']), 3)
+        self.assertEqual(len(second['favorites']), 2)
+        self.assertIsNone(second['next_cursor'])
+
+        self.assertEqual(self.app.get('/api/recipes/8/comments?after=bogus').status_code, 400)
+
+    @patch('app.spoonacular.session.get')
+    def test_get_user_favorites_hydrated(self, mock_get):
+        """
+        test that favorites store only recipe ids and are hydrated from the shared recipe store
+
+        verifies that:
+        1. the favorite document holds no recipe blob
+        2. stored recipes are read from the recipes collection
+        3. missing recipes are fetched with one informationBulk call and then stored
+        """
+        db.favorites.delete_many({})
+        recipe_corpus.add_recipes([{'id': 10, 'title': 'Stored Recipe', 'extendedIngredients': []}])
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = [{'id': 11, 'title': 'Fetched Recipe', 'extendedIngredients': []}]
+
+        self.login(self.app)
+        for recipe_id in (10, 11):
+            self.app.post('/api/favorites', json={'recipeId': recipe_id, 'recipe': {'title': 'ignored'}})
+        self.assertNotIn('recipe_data', db.favorites.find_one({'recipe_id': 10}))
+
+        for _ in range(2):
+            favorites = self.app.get('/api/user/favorites').get_json()['favorites']
+            self.assertEqual({favorite['title'] for favorite in favorites}, {'Stored Recipe', 'Fetched Recipe'})
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs['params']['ids'], '11')
+
     def test_health_check(self):
         """
         check Spoonacular API key is in the response
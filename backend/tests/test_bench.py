@@ -0,0 +1,41 @@
+import unittest
+import requests
+from bench.fake_spoonacular import FakeSpoonacular
+from bench.fixtures import make_recipes
+from bench.report import compare, percentile
+
+class TestBench(unittest.TestCase):
+    """unit tests for the offline benchmark tooling
+    """
+
+    def test_fake_spoonacular_pages_searches(self):
+        """
+        test that the stand-in filters by ingredient, pages with offset/number and serves bulk lookups
+        """
+        fake = FakeSpoonacular(make_recipes(), latency=0).start()
+        try:
+            params = {'includeIngredients': 'garlic', 'offset': 0, 'number': 5}
+            page = requests.get(f"{fake.base_url}/recipes/complexSearch", params=params).json()
+            self.assertEqual(len(page['results']), 5)
+            self.assertTrue(all(
+                any('garlic' in i['name'] for i in recipe['extendedIngredients']) for recipe in page['results']
+            ))
+            ids = ','.join(str(recipe['id']) for recipe in page['results'][:2])
+            bulk = requests.get(f"{fake.base_url}/recipes/informationBulk", params={'ids': ids}).json()
+            self.assertEqual(len(bulk), 2)
+            self.assertEqual(fake.requests, 2)
+        finally:
+            fake.stop()
+
+    def test_compare_flags_regressions(self):
+        """
+        test that slower latencies, lower throughput and new errors are reported, within tolerance not
+        """
+        baseline = {'load': {'recipes': {'p50_ms': 10, 'p99_ms': 50, 'throughput_rps': 100, 'errors': 0}}}
+        report = {'load': {'recipes': {'p50_ms': 11, 'p99_ms': 80, 'throughput_rps': 70, 'errors': 2}}}
+        metrics = {item['metric'] for item in compare(report, baseline, tolerance=0.2)}
+        self.assertEqual(metrics, {'p99_ms', 'throughput_rps', 'errors'})
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import patch
+from cache import LRUCache, make_cache_key
+
+class TestCache(unittest.TestCase):
+    """unit tests for the recipe result cache
+    """
+
+    def test_make_cache_key_normalizes_params(self):
+        """
+        test that key order, case and the API key do not affect the cache key
+        """
+        first = make_cache_key({'apiKey': 'a', 'query': 'Pasta ', 'number': 10})
+        second = make_cache_key({'number': '10', 'query': 'pasta', 'apiKey': 'b'})
+        self.assertEqual(first, second)
+        self.assertNotIn('apikey', first)
+
+    def test_lru_eviction(self):
+        """
+        test that the least recently used entry is evicted first
+        """
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_lru_ttl(self):
+        """
+        test that expired entries count as misses
+        """
+        cache = LRUCache(maxsize=2, ttl=10)
+        with patch('cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with patch('cache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.misses, 1)
+
+if __name__ == '__main__':
+    unittest.main()
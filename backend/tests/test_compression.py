@@ -0,0 +1,97 @@
+import gzip
+import zlib
+import unittest
+from unittest.mock import patch
+from flask import Flask, jsonify, stream_with_context
+import compression
+from compression import ResponseCompressor
+from responses import PrecomputedResponse
+
+class TestCompression(unittest.TestCase):
+    """unit tests for negotiated response compression
+    """
+
+    def setUp(self):
+        self.compressor = ResponseCompressor(min_size=100)
+        app = Flask(__name__)
+        app.after_request(self.compressor)
+        payload = PrecomputedResponse([{'title': f'Recipe {i}', 'calories': i} for i in range(50)])
+
+        @app.route('/large')
+        def large():
+            return jsonify([{'title': f'Recipe {i}', 'calories': i} for i in range(50)])
+
+        @app.route('/small')
+        def small():
+            return jsonify({'ok': True})
+
+        @app.route('/stream')
+        def stream():
+            lines = (f'{{"line": {i}}}\n'.encode() for i in range(3))
+            return app.response_class(stream_with_context(lines), mimetype='application/x-ndjson')
+
+        @app.route('/precomputed')
+        def precomputed():
+            return payload.response()
+
+        self.client = app.test_client()
+
+    def test_gzip_when_accepted(self):
+        """
+        test that large JSON is gzipped for clients that accept it and left alone otherwise
+        """
+        with patch.object(compression, 'brotli', None):
+            response = self.client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data)[:10], b'[{"calorie')
+
+        plain = self.client.get('/large')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+
+    def test_small_responses_not_compressed(self):
+        """
+        test that bodies under the size threshold are sent as is
+        """
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_compressed_bytes_memoized(self):
+        """
+        test that an identical body is compressed once and served from the memo afterwards
+        """
+        with patch.object(compression, 'brotli', None), patch('compression.gzip.compress', wraps=gzip.compress) as compress:
+            first = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+            second = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(self.compressor.stats()['memo']['hits'], 1)
+
+    def test_compressed_etag_revalidates(self):
+        """
+        test that a compressed precomputed response carries a weak ETag that still revalidates
+        """
+        with patch.object(compression, 'brotli', None):
+            response = self.client.get('/precomputed', headers={'Accept-Encoding': 'gzip'})
+            etag = response.headers['ETag']
+            self.assertTrue(etag.startswith('W/'))
+            revalidated = self.client.get('/precomputed', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_streamed_ndjson_compressed_per_chunk(self):
+        """
+        test that streamed NDJSON is gzipped with a flush after every chunk
+        """
+        with patch.object(compression, 'brotli', None):
+            response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+            chunks = list(response.response)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(chunks), 4)
+
+        decoder = zlib.decompressobj(31)
+        self.assertEqual(decoder.decompress(chunks[0]), b'{"line": 0}\n')
+        self.assertEqual(gzip.decompress(b''.join(chunks)).decode().splitlines()[-1], '{"line": 2}')
+
+if __name__ == '__main__':
+    unittest.main()
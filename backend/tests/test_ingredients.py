@@ -0,0 +1,69 @@
+import random
+import unittest
+from difflib import SequenceMatcher
+from ingredients import IngredientMatcher, ingredient_matches
+
+def reference_match(ingredient, name, threshold=0.7):
+    return SequenceMatcher(None, ingredient, name).ratio() >= threshold or ingredient in name
+
+class TestIngredients(unittest.TestCase):
+    """unit tests for the fuzzy ingredient matcher
+    """
+
+    def setUp(self):
+        rng = random.Random(162)
+        words = ['chicken', 'chiken', 'breast', 'rice', 'brown rice', 'garlic', 'garlic powder',
+                 'tomato', 'tomatoes', 'olive oil', 'oil', 'basil', 'pasta', 'egg', 'eggs']
+        self.names = set(words)
+        for _ in range(300):
+            self.names.add(''.join(rng.choice('abcdeilnorst ') for _ in range(rng.randint(1, 14))))
+        self.tokens = words + [''.join(rng.choice('abcdeilnorst') for _ in range(rng.randint(1, 8))) for _ in range(100)]
+
+    def test_ingredient_matches_reference(self):
+        """
+        test that the bounded check accepts exactly what the difflib ratio and substring check accept
+        """
+        for token in self.tokens:
+            for name in self.names:
+                self.assertEqual(ingredient_matches(token, name), reference_match(token, name), (token, name))
+
+    def test_resolve_matches_reference(self):
+        """
+        test that resolving a token against the vocabulary returns every matching name,
+        including names added after the token was first resolved
+        """
+        names = sorted(self.names)
+        matcher = IngredientMatcher()
+        matcher.add(names[:150])
+        for token in self.tokens:
+            matcher.resolve(token)
+        matcher.add(names[150:])
+        for token in self.tokens:
+            expected = {name for name in names if reference_match(token, name)}
+            self.assertEqual(matcher.resolve(token), expected, token)
+
+    def test_filter_recipes_preserves_order(self):
+        """
+        test that recipes must match every requested ingredient and keep their order
+        """
+        recipes = [
+            {'id': 1, 'extendedIngredients': [{'name': 'Chicken Breast'}, {'name': 'Rice'}]},
+            {'id': 2, 'extendedIngredients': [{'name': 'rice'}]},
+            {'id': 3, 'extendedIngredients': [{'name': 'chiken'}, {'name': 'brown rice'}]}
+        ]
+        result = IngredientMatcher().filter_recipes(recipes, ['chicken', 'rice'])
+        self.assertEqual([recipe['id'] for recipe in result], [1, 3])
+
+    def test_resolved_sets_are_not_mutated(self):
+        """
+        test that adding names replaces cached resolutions instead of changing sets callers hold
+        """
+        matcher = IngredientMatcher()
+        matcher.add(['tomato'])
+        before = matcher.resolve('tomatoes')
+        matcher.add(['tomatos'])
+        self.assertEqual(before, {'tomato'})
+        self.assertEqual(matcher.resolve('tomatoes'), {'tomato', 'tomatos'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from bson.objectid import ObjectId
+from flask import Flask, jsonify
+import json_provider
+from json_provider import FastJSONProvider, dumps_bytes
+
+class TestJSONProvider(unittest.TestCase):
+    """unit tests for the JSON provider used for API responses
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.json = FastJSONProvider(self.app)
+        self.document = {
+            '_id': ObjectId('65a1b2c3d4e5f60718293a4b'),
+            'created_at': datetime(2024, 1, 2, 3, 4, 5, 678000),
+            'recipe_ids': {7}
+        }
+
+    def test_mongo_types_encoded(self):
+        """
+        test that ObjectIds become strings and datetimes ISO 8601 strings, as the old per-document loops produced
+        """
+        with self.app.test_request_context():
+            data = jsonify([self.document]).get_json()
+        self.assertEqual(data[0]['_id'], '65a1b2c3d4e5f60718293a4b')
+        self.assertEqual(data[0]['created_at'], self.document['created_at'].isoformat())
+        self.assertEqual(data[0]['recipe_ids'], [7])
+
+    def test_stdlib_fallback_matches(self):
+        """
+        test that the standard library fallback produces the same JSON
+        """
+        fast = dumps_bytes(self.document)
+        with patch.object(json_provider, 'orjson', None):
+            self.assertEqual(dumps_bytes(self.document), fast)
+
+    def test_unknown_type_rejected(self):
+        """
+        test that unsupported objects still raise TypeError
+        """
+        with self.assertRaises(TypeError):
+            dumps_bytes({'value': object()})
+
+if __name__ == '__main__':
+    unittest.main()
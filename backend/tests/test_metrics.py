@@ -0,0 +1,84 @@
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from logs import JsonFormatter, ProcessQueueHandler
+from metrics import Histogram, PhaseTimer
+
+class TestMetrics(unittest.TestCase):
+    """unit tests for request metrics and structured logging
+    """
+
+    def test_histogram_buckets_are_cumulative(self):
+        """
+        test that observations land in cumulative buckets with sum and count
+        """
+        histogram = Histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, '/recipes')
+        lines = histogram.render()
+        self.assertIn('latency_seconds_bucket{endpoint="/recipes",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{endpoint="/recipes",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{endpoint="/recipes",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_count{endpoint="/recipes"} 3', lines)
+
+    def test_nested_phases_are_exclusive(self):
+        """
+        test that time in an inner phase or reported by a driver is not counted for the outer phase
+        """
+        timer = PhaseTimer()
+        timer.enter('filter')
+        time.sleep(0.01)
+        timer.enter('upstream')
+        time.sleep(0.02)
+        timer.exit()
+        timer.record('mongo', 0.005)
+        timer.exit()
+        self.assertGreaterEqual(timer.totals['upstream'], 0.02)
+        self.assertLess(timer.totals['filter'], 0.02)
+        self.assertEqual(timer.totals['mongo'], 0.005)
+
+    def test_json_log_lines(self):
+        """
+        test that log records become one JSON object per line including extra fields
+        """
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger('test_metrics.json')
+        logger.addHandler(handler)
+        logger.propagate = False
+        logger.warning("Returning recipes", extra={'count': 3})
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry['level'], entry['msg'], entry['count']), ('WARNING', 'Returning recipes', 3))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_queue_listener_restarts_after_fork(self):
+        """
+        test that a process forked after logging is configured still writes its records
+        """
+        with tempfile.TemporaryFile('w+') as output:
+            handler = ProcessQueueHandler(output)
+            logger = logging.getLogger('test_metrics.fork')
+            logger.addHandler(handler)
+            logger.propagate = False
+            logger.warning("parent started")
+
+            pid = os.fork()
+            if pid == 0:
+                logger.warning("from child")
+                handler.stop()
+                os._exit(0)
+            os.waitpid(pid, 0)
+            logger.warning("from parent")
+            handler.stop()
+
+            output.seek(0)
+            messages = [json.loads(line)['msg'] for line in output]
+        self.assertEqual(sorted(messages), ['from child', 'from parent', 'parent started'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from authlib.integrations.flask_client import OAuth
+from flask import Flask
+from joserfc import jwt
+from joserfc.jwk import RSAKey
+from oidc import CachedMetadataOAuth2App, OIDCMetadataCache
+
+ISSUER = 'http://dex.test'
+
+def make_response(payload, headers=None):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = payload
+    response.headers = headers or {}
+    return response
+
+class FakeDex:
+    """serves discovery and a replaceable key set, counting requests per URL"""
+
+    def __init__(self, key, delay=0):
+        self.key = key
+        self.delay = delay
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.calls[url] = self.calls.get(url, 0) + 1
+        time.sleep(self.delay)
+        if url.endswith('/.well-known/openid-configuration'):
+            return make_response({'issuer': ISSUER, 'jwks_uri': f'{ISSUER}/keys',
+                                  'id_token_signing_alg_values_supported': ['RS256']})
+        return make_response({'keys': [self.key.as_dict(private=False)]}, {'Cache-Control': 'max-age=120'})
+
+def sign_id_token(key, nonce='n'):
+    now = int(time.time())
+    claims = {'iss': ISSUER, 'sub': 'u1', 'aud': 'flask-app', 'exp': now + 300, 'iat': now, 'nonce': nonce}
+    return jwt.encode({'alg': 'RS256', 'kid': key.kid}, claims, key)
+
+class TestOIDC(unittest.TestCase):
+    """unit tests for the cached Dex discovery document and key set
+    """
+
+    def setUp(self):
+        self.key = RSAKey.generate_key(2048, parameters={'kid': 'k1'})
+        self.dex = FakeDex(self.key)
+        self.cache = OIDCMetadataCache(self.dex, f'{ISSUER}/.well-known/openid-configuration')
+        self.cache.start = lambda: self.cache
+        app = Flask(__name__)
+        oauth = OAuth(app)
+        self.client = oauth.register(
+            name='dex',
+            client_id='flask-app',
+            client_secret='secret',
+            token_endpoint='http://dex-internal/token',
+            client_cls=CachedMetadataOAuth2App,
+            metadata_cache=self.cache
+        )
+
+    def test_metadata_loaded_once_and_configured_endpoints_win(self):
+        """
+        test that logins reuse the cached metadata and keys
+
+        verifies that:
+        1. discovery and keys are fetched once for several ID tokens
+        2. the JWKS max-age bounds the refresh interval
+        3. endpoints set at registration override the discovered ones
+        """
+        for _ in range(3):
+            claims = self.client.parse_id_token({'id_token': sign_id_token(self.key)}, nonce='n')
+            self.assertEqual(claims['sub'], 'u1')
+        self.assertEqual(self.dex.calls, {
+            f'{ISSUER}/.well-known/openid-configuration': 1,
+            f'{ISSUER}/keys': 1
+        })
+        self.assertLessEqual(self.cache.stats()['expires_in'], 120)
+        self.assertEqual(self.client.load_server_metadata()['token_endpoint'], 'http://dex-internal/token')
+
+    def test_unknown_kid_refetches_once(self):
+        """
+        test that tokens signed by a rotated key trigger a single coalesced key refetch
+        """
+        self.cache.refresh()
+        rotated = RSAKey.generate_key(2048, parameters={'kid': 'k2'})
+        self.dex.key = rotated
+        self.dex.delay = 0.05
+        token = sign_id_token(rotated)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.client.parse_id_token({'id_token': token}, nonce='n')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(self.dex.calls[f'{ISSUER}/keys'], 2)
+        self.assertEqual(self.cache.stats()['forced_refetches'], 1)
+
+    def test_unreachable_provider(self):
+        """
+        test that an unreachable Dex leaves the configured endpoints usable and reports the error
+        """
+        self.dex.get = MagicMock(side_effect=ConnectionError('dex down'))
+        self.assertEqual(self.client.load_server_metadata()['token_endpoint'], 'http://dex-internal/token')
+        self.assertEqual(self.cache.stats()['last_error'], 'dex down')
+        with self.assertRaises(ConnectionError):
+            self.cache.jwk_set()
+
+if __name__ == '__main__':
+    unittest.main()
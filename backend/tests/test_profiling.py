@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+import unittest
+from flask import Flask, jsonify
+from profiling import RequestProfiler
+
+def busy_loop(n):
+    return sum(i * i for i in range(n))
+
+class TestProfiling(unittest.TestCase):
+    """unit tests for the on-demand request profiler
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_client(self, profiler):
+        app = Flask(__name__)
+        profiler.init_app(app)
+
+        @app.route('/work')
+        def work():
+            return jsonify({'total': busy_loop(20000)})
+
+        return app, app.test_client()
+
+    def test_admin_header_profiles_request(self):
+        """
+        test that only requests carrying the admin token are profiled and summarized
+
+        verifies that:
+        1. a request without the header is not profiled
+        2. a request with the token gets a profile id and a file on disk
+        3. the summary lists the handler's hot function
+        """
+        profiler = RequestProfiler(self.directory, token='secret')
+        _, client = self.make_client(profiler)
+
+        self.assertNotIn('X-Profile-Id', client.get('/work').headers)
+        self.assertNotIn('X-Profile-Id', client.get('/work', headers={'X-Profile': 'wrong'}).headers)
+        response = client.get('/work', headers={'X-Profile': 'secret'})
+        self.assertIn(response.headers['X-Profile-Id'], profiler.profiles())
+
+        summary = profiler.summary(terms=['busy_loop'], endpoint='/work')
+        self.assertEqual(summary['profiled'], 1)
+        self.assertEqual(len(summary['profiles']), 1)
+        self.assertTrue(any('busy_loop' in entry['function'] for entry in summary['functions']))
+
+    def test_rotation_keeps_newest(self):
+        """
+        test that sampled profiles rotate so only the newest `keep` files remain
+        """
+        profiler = RequestProfiler(self.directory, sample_rate=1.0, keep=2)
+        _, client = self.make_client(profiler)
+        ids = [client.get('/work').headers['X-Profile-Id'] for _ in range(4)]
+        self.assertEqual(profiler.profiles(), sorted(ids[-2:]))
+
+    def test_disabled_installs_no_hooks(self):
+        """
+        test that a profiler without token or sample rate adds nothing to the request path
+        """
+        app, client = self.make_client(RequestProfiler(self.directory))
+        self.assertFalse(app.before_request_funcs)
+        self.assertNotIn('X-Profile-Id', client.get('/work').headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+from datetime import datetime
+import unittest
+import mongomock
+from quota import QuotaController, QuotaRejected
+
+class TestQuota(unittest.TestCase):
+    """unit tests for Spoonacular admission control
+    """
+
+    def setUp(self):
+        self.collection = mongomock.MongoClient().db.quota_buckets
+        self.quota = QuotaController(self.collection, daily_points=100, client_share=0.5, degraded_fraction=0)
+
+    def test_client_buckets_expire(self):
+        """
+        test that per-client bucket documents carry a TTL deadline and the shared one does not
+        """
+        self.quota.admit('1.2.3.4', 2)
+        client = self.collection.find_one({'_id': 'client:1.2.3.4'})
+        self.assertGreater(client['expires_at'], datetime.utcnow())
+        self.assertNotIn('expires_at', self.collection.find_one({'_id': 'spoonacular'}))
+
+    def test_exhausted_budget_does_not_charge_client(self):
+        """
+        test that a call refused by the shared budget leaves the client's share untouched
+        """
+        self.quota.admit('1.2.3.4', 10)
+        self.collection.update_one({'_id': 'spoonacular'}, {'$set': {'tokens': 1.0}})
+        with self.assertRaises(QuotaRejected) as context:
+            self.quota.admit('1.2.3.4', 10)
+        self.assertEqual(context.exception.reason, 'exhausted')
+        tokens = self.collection.find_one({'_id': 'client:1.2.3.4'})['tokens']
+        self.assertAlmostEqual(tokens, 40, places=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+import unittest
+from unittest.mock import patch
+import mongomock
+from flask import Flask, jsonify, session
+from sessions import MongoSessionInterface
+
+def make_app(collection):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.session_interface = MongoSessionInterface(collection)
+
+    @app.route('/start')
+    def start():
+        session['nonce'] = 'n'
+        return jsonify({'ok': True})
+
+    @app.route('/login')
+    def login():
+        session['user'] = {'sub': 'u1', 'email': 'cook@example.com', 'claims': 'x' * 2000}
+        session.regenerate()
+        session.permanent = True
+        return jsonify({'ok': True})
+
+    @app.route('/me')
+    def me():
+        return jsonify(session.get('user'))
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return jsonify({'ok': True})
+
+    return app
+
+class TestSessions(unittest.TestCase):
+    """unit tests for the Mongo-backed session interface
+    """
+
+    def setUp(self):
+        self.collection = mongomock.MongoClient().db.sessions
+        self.app = make_app(self.collection)
+        self.client = self.app.test_client()
+
+    def test_cookie_holds_only_session_id(self):
+        """
+        test that session data is stored in Mongo and read back through the cache
+
+        verifies that:
+        1. the cookie carries a short id instead of the user's claims
+        2. later requests are served from the LRU without reading Mongo
+        3. another process with a cold cache loads the session from Mongo
+        """
+        self.client.get('/login')
+        cookie = self.client.get_cookie('session').value
+        self.assertLess(len(cookie), 64)
+        self.assertEqual(self.collection.find_one()['data']['user']['sub'], 'u1')
+
+        interface = self.app.session_interface
+        for _ in range(3):
+            self.assertEqual(self.client.get('/me').get_json()['sub'], 'u1')
+        self.assertEqual(interface.reads, 0)
+        self.assertEqual(interface.writes, 1)
+
+        other = make_app(self.collection).test_client()
+        other.set_cookie('session', cookie)
+        self.assertEqual(other.get('/me').get_json()['email'], 'cook@example.com')
+
+    def test_stale_revision_reloads(self):
+        """
+        test that a cached copy older than the cookie's revision is not used
+        """
+        self.client.get('/login')
+        other_app = make_app(self.collection)
+        other = other_app.test_client()
+        other.set_cookie('session', self.client.get_cookie('session').value)
+        self.assertEqual(other.get('/me').get_json()['sub'], 'u1')
+
+        # Written by the first process; the second only has the old revision cached
+        with self.client.session_transaction() as sess:
+            sess['user'] = {'sub': 'u2'}
+        other.set_cookie('session', self.client.get_cookie('session').value)
+        self.assertEqual(other.get('/me').get_json()['sub'], 'u2')
+
+    def test_logout_and_expiry(self):
+        """
+        test that clearing the session removes it and expired sessions are not loaded
+        """
+        self.client.get('/login')
+        cookie = self.client.get_cookie('session').value
+        self.client.get('/logout')
+        self.assertEqual(self.collection.count_documents({}), 0)
+        self.assertIsNone(self.client.get_cookie('session'))
+
+        self.client.get('/login')
+        self.collection.update_many({}, {'$set': {'expires_at': datetime.utcnow() - timedelta(seconds=1)}})
+        stale = make_app(self.collection).test_client()
+        stale.set_cookie('session', self.client.get_cookie('session').value)
+        self.assertIsNone(stale.get('/me').get_json())
+        self.assertNotEqual(cookie, self.client.get_cookie('session').value)
+
+    def test_login_rotates_session_id(self):
+        """
+        test that authenticating moves the session to a new id and drops the old one
+        """
+        self.client.get('/start')
+        anonymous = self.client.get_cookie('session').value
+        self.client.get('/login')
+        authenticated = self.client.get_cookie('session').value
+
+        self.assertNotEqual(anonymous.split('.')[0], authenticated.split('.')[0])
+        self.assertEqual(self.collection.count_documents({}), 1)
+        self.assertEqual(self.collection.find_one()['data']['nonce'], 'n')
+
+        fixated = make_app(self.collection).test_client()
+        fixated.set_cookie('session', anonymous)
+        self.assertIsNone(fixated.get('/me').get_json())
+
+    def test_logout_reaches_other_workers_within_cache_ttl(self):
+        """
+        test that a session cached by another process is served without Mongo and stops working
+        once its cache entry expires after logout
+
+        verifies that:
+        1. cached requests in the other process do not read Mongo
+        2. after logout the other process drops the session when its cache entry runs out
+        """
+        self.client.get('/login')
+        cookie = self.client.get_cookie('session').value
+        other_app = make_app(self.collection)
+        other = other_app.test_client()
+        other.set_cookie('session', cookie)
+        with patch('cache.time.monotonic', return_value=100):
+            for _ in range(3):
+                self.assertEqual(other.get('/me').get_json()['sub'], 'u1')
+        self.assertEqual(other_app.session_interface.reads, 1)
+
+        self.client.get('/logout')
+        with patch('cache.time.monotonic', return_value=100 + other_app.session_interface.cache.ttl):
+            self.assertIsNone(other.get('/me').get_json())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import threading
+import time
+import unittest
+from singleflight import SingleFlight, SingleFlightTimeout
+
+class TestSingleFlight(unittest.TestCase):
+    """unit tests for upstream request coalescing
+    """
+
+    def run_concurrently(self, flight, fn, count=8, timeout=None):
+        results = [None] * count
+        barrier = threading.Barrier(count)
+
+        def worker(i):
+            barrier.wait()
+            try:
+                results[i] = flight.do('key', fn, timeout=timeout)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        """
+        test that identical concurrent calls run the function once and share its result
+        """
+        flight = SingleFlight()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'results': []}
+
+        results = self.run_concurrently(flight, fetch)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'results': []} for result in results))
+        self.assertEqual(flight.stats()['coalesced'], 7)
+
+    def test_errors_propagate_to_waiters(self):
+        """
+        test that every waiting caller receives the leader's exception
+        """
+        flight = SingleFlight()
+
+        def fetch():
+            time.sleep(0.2)
+            raise ValueError('upstream failed')
+
+        results = self.run_concurrently(flight, fetch, count=4)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_waiters_time_out(self):
+        """
+        test that waiters give up after their timeout while the leader finishes
+        """
+        flight = SingleFlight()
+        results = self.run_concurrently(flight, lambda: time.sleep(0.5) or 'done', count=3, timeout=0.05)
+        self.assertEqual(results.count('done'), 1)
+        self.assertEqual(sum(isinstance(result, SingleFlightTimeout) for result in results), 2)
+
+if __name__ == '__main__':
+    unittest.main()
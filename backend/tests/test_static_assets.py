@@ -0,0 +1,63 @@
+import gzip
+import os
+import tempfile
+import unittest
+from flask import Flask
+from static_assets import StaticAssets
+
+class TestStaticAssets(unittest.TestCase):
+    """unit tests for the in-memory frontend asset server
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = os.path.join(self.tmp.name, 'static')
+        os.makedirs(os.path.join(root, 'assets'))
+        with open(os.path.join(root, 'assets', 'index-a1B2c3D4.js'), 'w') as f:
+            f.write('console.log("recipes");\n' * 200)
+        with open(os.path.join(root, 'favicon.svg'), 'w') as f:
+            f.write('<svg></svg>')
+        index_path = os.path.join(self.tmp.name, 'index.html')
+        with open(index_path, 'w') as f:
+            f.write('<html><body>app</body></html>')
+        self.assets = StaticAssets(root, index_path).load()
+
+        app = Flask(__name__)
+
+        @app.route('/<path:path>')
+        def serve(path):
+            return (self.assets.get(path) or self.assets.index).response()
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hashed_asset_served_from_memory(self):
+        """
+        test that a hashed build asset is immutable and served precompressed when accepted
+        """
+        os.remove(os.path.join(self.tmp.name, 'static', 'assets', 'index-a1B2c3D4.js'))
+        response = self.client.get('/assets/index-a1B2c3D4.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(gzip.decompress(response.data).startswith(b'console.log'))
+
+        plain = self.client.get('/assets/index-a1B2c3D4.js')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        revalidated = self.client.get('/assets/index-a1B2c3D4.js', headers={'If-None-Match': plain.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_unhashed_files_and_index_revalidate(self):
+        """
+        test that unhashed files and the index fallback must be revalidated
+        """
+        self.assertEqual(self.client.get('/favicon.svg').headers['Cache-Control'], 'no-cache')
+        response = self.client.get('/some/client/route')
+        self.assertEqual(response.data, b'<html><body>app</body></html>')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(self.assets.stats()['assets'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from upstream import CircuitBreaker, UpstreamClient, UpstreamUnavailable
+
+class TestUpstream(unittest.TestCase):
+    """unit tests for the pooled upstream client
+    """
+
+    def setUp(self):
+        self.client = UpstreamClient('test', retries=2, backoff=0,
+                                     breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        self.client.session.get = MagicMock()
+
+    def test_retries_transient_errors(self):
+        """
+        test that 5xx responses are retried until one succeeds
+        """
+        self.client.session.get.side_effect = [MagicMock(status_code=503), MagicMock(status_code=200)]
+        response = self.client.get('https://example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.stats()['retries'], 1)
+
+    def test_circuit_opens_after_failures(self):
+        """
+        test that repeated connection failures open the circuit and later calls fail fast
+        """
+        self.client.session.get.side_effect = requests.ConnectionError('refused')
+        for _ in range(2):
+            with self.assertRaises(UpstreamUnavailable):
+                self.client.get('https://example.com')
+        calls = self.client.session.get.call_count
+
+        with self.assertRaises(UpstreamUnavailable):
+            self.client.get('https://example.com')
+        self.assertEqual(self.client.session.get.call_count, calls)
+        self.assertEqual(self.client.stats()['circuit']['state'], 'open')
+
+    def test_quota_response_opens_circuit(self):
+        """
+        test that a 402 response opens the circuit with the quota reason
+        """
+        self.client.session.get.return_value = MagicMock(status_code=402)
+        self.assertEqual(self.client.get('https://example.com').status_code, 402)
+        with self.assertRaises(UpstreamUnavailable) as context:
+            self.client.get('https://example.com')
+        self.assertEqual(context.exception.reason, 'quota')
+
+    def test_half_open_probe_closes_circuit(self):
+        """
+        test that a successful probe after the reset timeout closes the circuit
+        """
+        self.client.breaker.record_failure()
+        self.client.breaker.record_failure()
+        self.client.session.get.return_value = MagicMock(status_code=200)
+        with patch('upstream.time.monotonic', return_value=10 ** 9):
+            self.client.get('https://example.com')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_failed_probe_reopens_circuit(self):
+        """
+        test that a half-open probe failing with any request error reopens the circuit
+
+        verifies that:
+        1. a truncated response counts as a failure rather than escaping the breaker
+        2. the next probe after the reset timeout is let through and can close the circuit
+        """
+        self.client.breaker.record_failure()
+        self.client.breaker.record_failure()
+        self.client.session.get.side_effect = requests.exceptions.ChunkedEncodingError('truncated')
+        with patch('upstream.time.monotonic', return_value=10 ** 9):
+            with self.assertRaises(UpstreamUnavailable):
+                self.client.get('https://example.com')
+        self.assertEqual(self.client.breaker.state, 'open')
+
+        self.client.session.get.side_effect = None
+        self.client.session.get.return_value = MagicMock(status_code=200)
+        with patch('upstream.time.monotonic', return_value=10 ** 10):
+            self.client.get('https://example.com')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_forked_child_gets_own_session(self):
+        """
+        test that a forked process does not reuse the parent's pooled keep-alive session
+        """
+        client = UpstreamClient('fork-test')
+        parent_session = client.session
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if client.session is not parent_session else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertIs(client.session, parent_session)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import phase
+
+# Statuses worth retrying: the request may succeed if sent again shortly
+RETRY_STATUSES = {500, 502, 503, 504}
+
+# Request errors worth retrying: the connection failed, timed out or was cut off mid-response
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+# Raised when an upstream service cannot be reached or the circuit is open
+class UpstreamUnavailable(Exception):
+    def __init__(self, name, reason, message=''):
+        super().__init__(message or f"{name} unavailable ({reason})")
+        self.name = name
+        self.reason = reason
+
+
+# Raised when the circuit breaker refuses a call, so no request was sent
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+# Stops calling an upstream after repeated failures, or for a longer cooldown
+# after a quota response, then lets a single probe request through
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, quota_cooldown=900):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.quota_cooldown = quota_cooldown
+        self.state = 'closed'
+        self.reason = None
+        self.failures = 0
+        self.opened_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() >= self.opened_until:
+                # Half-open: exactly one caller probes the upstream
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.reason = None
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self._open('failures', self.reset_timeout)
+
+    def record_quota_exceeded(self):
+        with self._lock:
+            self._open('quota', self.quota_cooldown)
+
+    def _open(self, reason, duration):
+        self.state = 'open'
+        self.reason = reason
+        self.opened_until = time.monotonic() + duration
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'reason': self.reason,
+            'consecutive_failures': self.failures,
+            'retry_in': max(0.0, round(self.opened_until - time.monotonic(), 1)) if self.state == 'open' else 0.0
+        }
+
+
+# Latency and error counters for one upstream
+class UpstreamMetrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.rejected = 0
+        self.statuses = {}
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency, status=None, error=False):
+        with self._lock:
+            self.requests += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if status is not None:
+                self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            if error:
+                self.errors += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'statuses': dict(self.statuses),
+                'latency_avg_ms': round(1000 * self.latency_total / self.requests, 1) if self.requests else 0.0,
+                'latency_max_ms': round(1000 * self.latency_max, 1)
+            }
+
+
+# HTTP client for one upstream service: a pooled keep-alive session with separate
+# connect/read timeouts, jittered retries and a circuit breaker
+class UpstreamClient:
+
+    def __init__(self, name, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.25, max_backoff=2.0, breaker=None):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = UpstreamMetrics()
+
+        self.pool_size = pool_size
+        self.session = self._new_session()
+        # A forked child must not share the parent's keep-alive sockets
+        os.register_at_fork(after_in_child=self._reset_session)
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _reset_session(self):
+        self.session = self._new_session()
+
+    # Full-jitter exponential backoff
+    def _sleep_before_retry(self, attempt):
+        self.metrics.record_retry()
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    # Time spent here, retries and backoff included, is the request's `upstream` phase
+    def get(self, url, params=None):
+        with phase('upstream'):
+            return self._get(url, params)
+
+    def _get(self, url, params):
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise CircuitOpen(self.name, self.breaker.reason or 'circuit_open')
+
+        # Every admitted call settles the breaker, so a failed half-open probe reopens it
+        # instead of leaving it half-open and rejecting all later calls
+        try:
+            response = self._send(url, params)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise UpstreamUnavailable(self.name, 'unreachable', f"{self.name} request failed: {e}") from e
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+
+        status = response.status_code
+        if status == 402:
+            self.breaker.record_quota_exceeded()
+        elif status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    # One request with retries on transient errors and retryable statuses
+    def _send(self, url, params):
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.metrics.record(time.monotonic() - started, error=True)
+                if isinstance(e, TRANSIENT_ERRORS) and attempt < self.retries:
+                    self._sleep_before_retry(attempt)
+                    attempt += 1
+                    continue
+                raise
+
+            status = response.status_code
+            self.metrics.record(time.monotonic() - started, status=status, error=status >= 500)
+            if status in RETRY_STATUSES and attempt < self.retries:
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+            return response
+
+    def stats(self):
+        stats = self.metrics.stats()
+        stats['circuit'] = self.breaker.stats()
+        return stats
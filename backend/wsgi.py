@@ -0,0 +1,2 @@
+# WSGI entrypoint for production servers: gunicorn -c gunicorn.conf.py wsgi:app
+from app import app